@@ -16,6 +16,7 @@ files and directories under /data and /etc. If a USB drive is mounted, the
 index and config files should reside there. If it doesn't exist yet, data is
 copied there from the prior index, and a new index is written in the USB drive.
 """
+import copy
 import os
 import json
 import logging
@@ -34,6 +35,11 @@ backup_robot_conf = '/etc/robot-data'
 backup_labware_def = '/etc/labware'
 index_filename = 'index.json'
 
+# In-process cache of the index file, keyed by its path and stat stamp so
+# that it is only parsed again when the file found by `settings_dir` changes
+_index_cache = {'key': None, 'index': None}
+read_counts = {'index': 0}
+
 
 def settings_dir():
     """
@@ -59,17 +65,70 @@ def settings_dir():
     return res
 
 
+def file_stamp(path: str):
+    """
+    Returns a value that changes whenever the file at :path: is modified,
+    replaced or removed (None if it does not exist)
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _locate_index() -> tuple:
+    """
+    Returns the path and stamp of the index file `settings_dir` would pick,
+    statting each candidate file once
+    """
+    if not override_settings_dir:
+        for directory in (usb_settings_dir, resin_settings_dir):
+            file_path = os.path.join(directory, index_filename)
+            stamp = file_stamp(file_path)
+            if stamp is not None:
+                return file_path, stamp
+    file_path = os.path.join(settings_dir(), index_filename)
+    return file_path, file_stamp(file_path)
+
+
+def _load_index() -> dict:
+    """
+    Returns the cached contents of the index file, shared by every caller so
+    it must not be modified. The index file is located on every call (so a
+    USB drive mounted later or a changed settings directory is picked up),
+    but only parsed again when it is a different file or it changed
+    """
+    key = _locate_index()
+    file_path = key[0]
+    if key != _index_cache['key']:
+        with open(file_path) as base_config_file:
+            index = json.load(base_config_file)
+        read_counts['index'] += 1
+        _index_cache.update(key=key, index=index)
+    return _index_cache['index']
+
+
 def get_config_index() -> dict:
     """
     Load the config index file from the settings directory. The `settings_dir`
     function should guarantee that this file exists.
+
+    Each call returns its own copy, see `_load_index`.
     :return: the contents of the the base config file
     """
-    base_path = settings_dir()
-    file_path = os.path.join(base_path, index_filename)
-    with open(file_path) as base_config_file:
-        res = json.load(base_config_file)
-    return res
+    return copy.deepcopy(_load_index())
+
+
+def feature_flag_file() -> str:
+    """
+    Path of the feature flag file in the current index, without copying it
+    """
+    return _load_index().get('featureFlagFile')
+
+
+def clear_index_cache():
+    _index_cache.update(key=None, index=None)
 
 
 def _move_settings_data(source_path_dict, dest_path_dict):
@@ -174,6 +233,7 @@ def write_base_config(path: str, config_data: dict):
     os.makedirs(path, exist_ok=True)
     with open(os.path.join(path, index_filename), 'w') as base_f:
         json.dump(config_data, base_f, indent=2)
+    clear_index_cache()
 
 
 # ---- Utility functions ----
@@ -1,25 +1,44 @@
 import os
 import json
-from opentrons.config import get_config_index
+from opentrons.config import feature_flag_file, file_stamp, read_counts
 
+# Parsed feature flag file, keyed by its path and stat stamp. Lookups only
+# stat the files involved and never re-parse unless something changed.
+_flag_cache = {'file': None, 'stamp': None, 'flags': {}}
+read_counts['featureFlags'] = 0
 
-def get_feature_flag(name: str) -> bool:
-    settings = get_all_feature_flags()
-    return bool(settings.get(name))
 
+def _load_flags() -> dict:
+    """
+    Returns the cached feature flags, shared by every caller so they must not
+    be modified
+    """
+    settings_file = feature_flag_file()
+    stamp = file_stamp(settings_file) if settings_file else None
+    if settings_file == _flag_cache['file'] \
+            and stamp == _flag_cache['stamp']:
+        return _flag_cache['flags']
 
-def get_all_feature_flags() -> dict:
-    settings_file = get_config_index().get('featureFlagFile')
-    if settings_file and os.path.exists(settings_file):
+    if stamp is not None:
         with open(settings_file, 'r') as fd:
             settings = json.load(fd)
+        read_counts['featureFlags'] += 1
     else:
         settings = {}
+    _flag_cache.update(file=settings_file, stamp=stamp, flags=settings)
     return settings
 
 
+def get_feature_flag(name: str) -> bool:
+    return bool(_load_flags().get(name))
+
+
+def get_all_feature_flags() -> dict:
+    return dict(_load_flags())
+
+
 def set_feature_flag(name: str, value):
-    settings_file = get_config_index().get('featureFlagFile')
+    settings_file = feature_flag_file()
     if os.path.exists(settings_file):
         with open(settings_file, 'r') as fd:
             settings = json.load(fd)
@@ -28,6 +47,16 @@ def set_feature_flag(name: str, value):
         settings = {name: value}
     with open(settings_file, 'w') as fd:
         json.dump(settings, fd)
+    _flag_cache.update(
+        file=settings_file, stamp=file_stamp(settings_file), flags=settings)
+
+
+def disk_reads() -> dict:
+    """
+    How many times the config index and feature flag file were actually read
+    from disk, rather than served from the in-process cache
+    """
+    return dict(read_counts)
 
 
 # short_fixed_trash
@@ -0,0 +1,154 @@
+"""
+Coalesced, atomic writes of json files.
+
+Calibration saves the same few files (labware offsets, the deck calibration)
+many times per minute, and each save used to rewrite the whole file in place
+on the SD card. Writes made through this module are held in memory for
+`delay` seconds after the first of them, during which later writes to the
+same path replace the pending one, and are then written to a temporary file
+that is renamed over the target, so a file is never left half written.
+
+Reads through `read_json` see pending writes, and `stamp` changes with them
+so caches keyed on file stamps do too. Pending writes are flushed when
+the delay expires, when `flush` is called (at the end of a calibration
+session) and when the interpreter exits.
+
+`fsync` controls what is synced to the storage device after each file is
+written:
+
+- 'never': nothing, the OS decides when data reaches the card
+- 'file': the file contents, before it is renamed over the target
+- 'always': the file contents and the directory holding the renamed file
+
+`stats` counts the files and bytes actually written, and the writes that
+were replaced by a later one before reaching the disk.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import threading
+
+from opentrons.config import file_stamp
+
+log = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('never', 'file', 'always')
+
+# Seconds a write is held before it is written to disk, 0 writes immediately
+delay = 1.0
+fsync = 'file'
+
+stats = {'files_written': 0, 'bytes_written': 0, 'coalesced': 0}
+
+_pending = {}
+# Identifies the pending write of each path, see `stamp`
+_pending_ids = {}
+_write_ids = itertools.count()
+_lock = threading.RLock()
+_timer = None
+
+
+def write_json(path: str, data, **dump_kwargs):
+    """
+    Schedules <data> to be written as json to <path>. <dump_kwargs> are
+    passed to `json.dumps`. The data is serialized immediately, so it may be
+    modified after this returns
+    """
+    global _timer
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError('fsync must be one of {}, not {!r}'.format(
+            FSYNC_POLICIES, fsync))
+    contents = json.dumps(data, **dump_kwargs).encode('utf-8')
+    with _lock:
+        if path in _pending:
+            stats['coalesced'] += 1
+        _pending[path] = contents
+        _pending_ids[path] = next(_write_ids)
+        if delay <= 0:
+            _flush_locked()
+        elif _timer is None:
+            _timer = threading.Timer(delay, flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def read_json(path: str):
+    """
+    Returns the json content of <path>, including a pending write. Raises
+    the same exceptions as opening and parsing the file would
+    """
+    with _lock:
+        contents = _pending.get(path)
+    if contents is not None:
+        return json.loads(contents.decode('utf-8'))
+    with open(path) as json_f:
+        return json.load(json_f)
+
+
+def stamp(path: str):
+    """
+    Returns a value that changes whenever <path> is written through this
+    module, even if the write is still pending, or is modified, replaced or
+    removed on disk (None if it does not exist and no write is pending)
+    """
+    with _lock:
+        pending_id = _pending_ids.get(path)
+    if pending_id is not None:
+        return ('pending', pending_id)
+    return file_stamp(path)
+
+
+def discard(path: str):
+    """
+    Drops a pending write to <path>, for files about to be removed
+    """
+    with _lock:
+        _pending.pop(path, None)
+        _pending_ids.pop(path, None)
+
+
+def flush():
+    """
+    Writes all pending files to disk
+    """
+    with _lock:
+        _flush_locked()
+
+
+def _flush_locked():
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+    while _pending:
+        path, contents = _pending.popitem()
+        _pending_ids.pop(path, None)
+        try:
+            _write_atomic(path, contents)
+        except OSError:
+            log.exception('Could not write {}'.format(path))
+
+
+def _write_atomic(path: str, contents: bytes):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as tmp_f:
+        tmp_f.write(contents)
+        if fsync != 'never':
+            tmp_f.flush()
+            os.fsync(tmp_f.fileno())
+    os.replace(tmp_path, path)
+    if fsync == 'always':
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    stats['files_written'] += 1
+    stats['bytes_written'] += len(contents)
+
+
+atexit.register(flush)
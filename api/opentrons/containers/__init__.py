@@ -1,9 +1,10 @@
 from collections import OrderedDict
-import json
-import os
 import warnings
 
-from opentrons.data_storage import database
+import numpy as np
+
+from opentrons.data_storage import database, old_container_loading
+from opentrons.data_storage.serializers import clone_labware
 from opentrons.containers.placeable import (
     Deck,
     Slot,
@@ -15,7 +16,6 @@ from opentrons.containers.placeable import (
     get_container
 )
 from opentrons.helpers import helpers
-from opentrons.util import environment
 
 __all__ = [
     Deck,
@@ -75,25 +75,58 @@ def list():
     return database.list_all_containers()
 
 
-def create(name, grid, spacing, diameter, depth, volume=0):
+def _row_name(row):
+    # A..Z, then AA..AZ, BA.. for plates with more than 26 rows
+    name = ''
+    row += 1
+    while row:
+        row, letter = divmod(row - 1, 26)
+        name = chr(letter + ord('A')) + name
+    return name
+
+
+def _grid_wells(grid, spacing):
+    """
+    Returns the names and (x, y) coordinates of the wells of a grid of
+    (columns, rows) wells, row by row, and its ordering (names by column)
+    """
     columns, rows = grid
     col_spacing, row_spacing = spacing
+    x = np.tile(np.arange(columns) * col_spacing, rows)
+    y = np.repeat(np.arange(rows) * row_spacing, columns)
+    row_names = [_row_name(r) for r in range(rows)]
+    col_names = [str(1 + c) for c in range(columns)]
+    names = [row + col for row in row_names for col in col_names]
+    ordering = [[row + col for row in row_names] for col in col_names]
+    return names, x.tolist(), y.tolist(), ordering
+
+
+def create(name, grid, spacing, diameter, depth, volume=0, save=True):
+    """
+    Creates a custom container of (columns, rows) wells, <spacing> (x, y)
+    apart. If <save>, it is also saved under <name> in the background, so
+    that it can be loaded by name
+    """
     custom_container = Container()
-    properties = {
-        'type': 'custom',
+    custom_container.properties['type'] = name
+    # All wells share one geometry
+    well_geometry = Well(properties={
         'diameter': diameter,
-        'height': depth,
+        'depth': depth,
         'total-liquid-volume': volume
-    }
+    }).properties
+
+    names, xs, ys, ordering = _grid_wells(grid, spacing)
+    for well_name, x, y in zip(names, xs, ys):
+        custom_container.add(
+            Well(properties=well_geometry), well_name, (x, y, 0))
+    custom_container.ordering = ordering
 
-    for r in range(rows):
-        for c in range(columns):
-            well = Well(properties=properties)
-            well_name = chr(r + ord('A')) + str(1 + c)
-            coordinates = (c * col_spacing, r * row_spacing, 0)
-            custom_container.add(well, well_name, coordinates)
-    database.save_new_container(custom_container, name)
-    return database.load_container(name)
+    if save:
+        # Saved from a copy, the returned container can be modified right away
+        database.save_new_container_async(
+            clone_labware(custom_container), name)
+    return custom_container
 
 
 # FIXME: [Jared - 8/31/17] This is not clean
@@ -123,13 +156,4 @@ def container_to_json(container, name):
 
 
 def save_custom_container(data):
-    container_file_path = environment.get_path('CONTAINERS_FILE')
-    if not os.path.isfile(container_file_path):
-        with open(container_file_path, 'w') as f:
-            f.write(json.dumps({'containers': {}}))
-    with open(container_file_path, 'r+') as f:
-        old_data = json.load(f)
-        old_data['containers'].update(data)
-        f.seek(0)
-        f.write(json.dumps(old_data, indent=4))
-        f.truncate()
+    old_container_loading.save_custom_containers(data)
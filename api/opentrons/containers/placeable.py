@@ -4,13 +4,75 @@ import numbers
 import re
 import functools
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping, Sequence
 from itertools import chain
 
 from opentrons.util.vector import Vector
 from opentrons.config import feature_flags as ff
 
 
+# Number of distinct well layouts whose grid is kept, see _grid_layout_for
+GRID_LAYOUT_CACHE_SIZE = 64
+
+
+class _FrozenDict(dict):
+    """
+    dict that can not be modified, for state shared between placeables
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(
+            '{} is shared and can not be modified'.format(
+                self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class WellGeometry(_FrozenDict):
+    """
+    Read-only well properties, one instance shared by every well with the
+    same properties (see :shared_geometry:)
+    """
+    __slots__ = ()
+
+    def __reduce__(self):
+        return (shared_geometry, (dict(self),))
+
+
+class _NoChildren(_FrozenDict):
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_NO_CHILDREN'
+
+
+# Children of every placeable until the first add(), so that wells do not
+# carry two empty dicts each
+_NO_CHILDREN = _NoChildren()
+_ORIGIN = Vector(0, 0, 0)
+_well_geometries = {}
+
+
+def shared_geometry(properties: dict) -> dict:
+    """
+    Returns the shared :WellGeometry: equal to :properties:
+    """
+    if isinstance(properties, WellGeometry):
+        return properties
+    try:
+        key = tuple(properties.items())
+        geometry = _well_geometries.get(key)
+    except TypeError:
+        # Unhashable values, don't share
+        return WellGeometry(properties)
+    if geometry is None:
+        geometry = _well_geometries[key] = WellGeometry(properties)
+    return geometry
+
+
 def unpack_location(location):
     """
     Returns (:Placeable:, :Vector:) tuple
@@ -88,6 +150,12 @@ class Placeable(object):
     * calculate coordinates in different reference systems
     """
 
+    # Subclasses other than Well keep a __dict__
+    __slots__ = (
+        'children_by_name', 'children_by_reference', '_child_table',
+        '_child_positions', '_coordinates_cache', '_relative_coordinates',
+        '_parent', 'properties', '__weakref__')
+
     def __init__(self, parent=None, properties=None):
         """
         Initiaize placeable.
@@ -98,10 +166,18 @@ class Placeable(object):
         """
 
         # For performance optimization reasons we are tracking children
-        # by name and by reference
-        self.children_by_name = OrderedDict()
-        self.children_by_reference = OrderedDict()
-        self._coordinates = Vector(0, 0, 0)
+        # by name and by reference, allocated by the first add()
+        self.children_by_name = _NO_CHILDREN
+        self.children_by_reference = _NO_CHILDREN
+        # Children in order and their positions, rebuilt after add()
+        self._child_table = None
+        self._child_positions = None
+
+        # Resolved coordinates() by reference, allocated by the first call and
+        # dropped whenever coordinates or parent of this placeable or any of
+        # its ancestors change
+        self._coordinates_cache = None
+        self._coordinates = _ORIGIN
 
         self.parent = parent
 
@@ -125,6 +201,34 @@ class Placeable(object):
             if dimension not in properties:
                 properties[dimension] = 0
 
+    @property
+    def _coordinates(self):
+        return self._relative_coordinates
+
+    @_coordinates.setter
+    def _coordinates(self, coordinates):
+        self._relative_coordinates = coordinates
+        self._invalidate_coordinates()
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        self._parent = parent
+        self._invalidate_coordinates()
+
+    def _invalidate_coordinates(self):
+        """
+        Drops cached coordinates of this placeable and all of its descendants
+        """
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            item._coordinates_cache = None
+            stack.extend(item.children_by_reference)
+
     def __getitem__(self, name):
         """
         Returns placeable by name or index
@@ -133,7 +237,7 @@ class Placeable(object):
         if isinstance(name, slice):
             return self.get_children_from_slice(name)
         elif isinstance(name, int):
-            return self.get_children_list()[name]
+            return self._children_table()[name]
         elif isinstance(name, str):
             return self.get_child_by_name(name)
         else:
@@ -157,10 +261,10 @@ class Placeable(object):
         )
 
     def __iter__(self):
-        return iter(self.get_children_list())
+        return iter(self._children_table())
 
     def __len__(self):
-        return len(self.get_children_list())
+        return len(self._children_table())
 
     def __bool__(self):
         return True
@@ -173,8 +277,8 @@ class Placeable(object):
         if not self.get_parent():
             raise Exception('Must have a parent')
 
-        children = self.parent.get_children_list()
-        my_loc = children.index(self)
+        children = self.parent._children_table()
+        my_loc = self.parent._children_positions()[self]
         return children[my_loc + 1]
 
     def iter(self):
@@ -211,11 +315,20 @@ class Placeable(object):
         """
         return self.properties.get('type', self.__class__.__name__)
 
+    def _children_table(self):
+        """
+        Returns an index-addressable sequence of children, in the same order
+        as :get_children_list:, that must not be modified
+        """
+        if self._child_table is None:
+            self._child_table = tuple(self.children_by_reference.keys())
+        return self._child_table
+
     def get_children_list(self):
         """
         Returns the list of children in the order they were added
         """
-        return list(self.children_by_reference.keys())
+        return list(self._children_table())
 
     def get_path(self, reference=None):
         """
@@ -247,8 +360,15 @@ class Placeable(object):
         """
         Returns the coordinates of a :Placeable: relative to :reference:
         """
+        cache = self._coordinates_cache
+        if cache is None:
+            cache = self._coordinates_cache = {}
+        elif reference in cache:
+            return cache[reference]
         coordinates = [i._coordinates for i in self.get_trace(reference)]
-        return functools.reduce(lambda a, b: a + b, coordinates)
+        res = functools.reduce(lambda a, b: a + b, coordinates)
+        cache[reference] = res
+        return res
 
     def add(self, child, name=None, coordinates=None):
         """
@@ -268,8 +388,12 @@ class Placeable(object):
         if coordinates:
             child._coordinates = Vector(coordinates)
         child.parent = self
+        if not self.children_by_reference:
+            self.children_by_name = OrderedDict()
+            self.children_by_reference = OrderedDict()
         self.children_by_name[name] = child
         self.children_by_reference[child] = name
+        self._child_table = None
 
     def get_deck(self):
         """
@@ -299,8 +423,27 @@ class Placeable(object):
         """
         Retrieves child's name by index
         """
-        return self.get_children_list().index(
-            self.get_child_by_name(name))
+        try:
+            return self._children_positions()[self.get_child_by_name(name)]
+        except KeyError:
+            raise ValueError('{} is not a child of {}'.format(name, self))
+
+    def _children_positions(self):
+        """
+        Maps each child to its index within :_children_table:, rebuilt
+        whenever the table itself is rebuilt
+        """
+        table = self._children_table()
+        positions = self._child_positions
+        if positions is None or positions[0] is not table \
+                or positions[1] != len(table):
+            index = {}
+            # Keep the first position of a child listed more than once,
+            # same as list.index()
+            for i, child in enumerate(table):
+                index.setdefault(child, i)
+            positions = self._child_positions = (table, len(table), index)
+        return positions[2]
 
     def get_children_from_slice(self, s):
         """
@@ -312,7 +455,7 @@ class Placeable(object):
         if isinstance(s.stop, str):
             s = slice(
                 s.start, self.get_index_from_name(s.stop), s.step)
-        return WellSeries(self.get_children_list()[s])
+        return WellSeries(list(self._children_table()[s]))
 
     def has_children(self):
         """
@@ -482,8 +625,20 @@ class Deck(Placeable):
 class Well(Placeable):
     """
     Class representing a Well
+
+    Properties are a :WellGeometry: shared with every other well of the same
+    shape, replace them with :shared_geometry: rather than modifying them
     """
-    pass
+    __slots__ = ()
+
+    def __init__(self, parent=None, properties=None):
+        if isinstance(properties, WellGeometry):
+            # Already complete, nothing for Placeable to fill in
+            super(Well, self).__init__(parent)
+            self.properties = properties
+        else:
+            super(Well, self).__init__(parent, properties)
+            self.properties = shared_geometry(self.properties)
 
 
 class Slot(Placeable):
@@ -502,7 +657,24 @@ class Container(Placeable):
         super(Container, self).__init__(*args, **kwargs)
         self.grid = None
         self.grid_transposed = None
-        self.ordering = None
+        self._ordering = None
+        # (split labware definitions flag, tuple of wells) built on first use
+        self._well_table = None
+
+    @property
+    def ordering(self):
+        return self._ordering
+
+    @ordering.setter
+    def ordering(self, ordering):
+        self._ordering = ordering
+        self._well_table = None
+        self.invalidate_grid()
+
+    def add(self, child, name=None, coordinates=None):
+        super(Container, self).add(child, name, coordinates)
+        self._well_table = None
+        self.invalidate_grid()
 
     def invalidate_grid(self):
         """
@@ -516,51 +688,41 @@ class Container(Placeable):
         Calculates and stores grid structure
         """
         if self.grid is None:
-            self.grid = self.get_wellseries(self.get_grid())
+            self.grid = _grid_series(
+                self._children_table(), self._grid_layout()[0])
 
         if self.grid_transposed is None:
-            self.grid_transposed = self.get_wellseries(
-                self.transpose(
-                    self.get_grid()))
+            self.grid_transposed = _grid_series(
+                self._children_table(), self._grid_layout()[1])
+
+    def _grid_layout(self):
+        """
+        Returns the (columns, rows) :_GridAxis: of the grid, with well
+        indexes into :_children_table:, shared by every container with the
+        same wells (and ordering, with split labware definitions)
+        """
+        if ff.split_labware_definitions():
+            ordering = tuple(tuple(col) for col in self.ordering)
+            names = tuple(chain.from_iterable(ordering))
+        else:
+            ordering = None
+            names = tuple(self.children_by_reference.values())
+        return _grid_layout_for(names, ordering)
 
     def get_grid(self):
         """
         Calculates the grid inferring row/column structure
         from indexes. Currently only Letter+Number names are supported
         """
-        columns = OrderedDict()
         if ff.split_labware_definitions():
-            # implementing this for compatibility, but new refactors and
-            # features should use `ordering` directly
-            for i, col in enumerate(self.ordering):
-                col_idx = str(i + 1)
-                columns[col_idx] = OrderedDict()
-                for well in col:
-                    row_idx = well[0]
-                    columns[col_idx][row_idx] = (row_idx, col_idx)
-        else:
-            index_pattern = r'^([A-Za-z]+)([0-9]+)$'
-            for name in self.children_by_name:
-                match = re.match(index_pattern, name)
-                if match:
-                    row, col = match.groups(0)
-                    if col not in columns:
-                        columns[col] = OrderedDict()
-                    columns[col][row] = (row, col)
-
-        return columns
+            return _grid_columns(self.children_by_name, self.ordering)
+        return _grid_columns(self.children_by_name, None)
 
     def transpose(self, rows):
         """
         Transposes the grid to allow for cols
         """
-        res = OrderedDict()
-        for row, cols in rows.items():
-            for col, cell in cols.items():
-                if col not in res:
-                    res[col] = OrderedDict()
-                res[col][row] = cell
-        return res
+        return _transpose(rows)
 
     def get_wellseries(self, matrix):
         """
@@ -588,7 +750,9 @@ class Container(Placeable):
         >>> plate.rows[0][0]
         >>> plate.rows['A']['1']
         """
-        self.calculate_grid()
+        if self.grid_transposed is None:
+            self.grid_transposed = _grid_series(
+                self._children_table(), self._grid_layout()[1])
         return self.grid_transposed
 
     @property
@@ -602,7 +766,9 @@ class Container(Placeable):
         >>> plate.columns[0][0]
         >>> plate.columns['1']['A']
         """
-        self.calculate_grid()
+        if self.grid is None:
+            self.grid = _grid_series(
+                self._children_table(), self._grid_layout()[0])
         return self.grid
 
     @property
@@ -658,11 +824,22 @@ class Container(Placeable):
         """
         return self.wells(*args, **kwargs)
 
-    def get_children_list(self):
-        if ff.split_labware_definitions():
-            return [self[i] for i in list(chain.from_iterable(self.ordering))]
-        else:
-            return super(Container, self).get_children_list()
+    def _children_table(self):
+        """
+        Wells in :ordering: order (or the order they were added if split
+        labware definitions are off), computed once and reused until the
+        ordering or the wells change
+        """
+        split = ff.split_labware_definitions()
+        if self._well_table is None or self._well_table[0] != split:
+            if split:
+                table = tuple(
+                    self.children_by_name.get(name)
+                    for name in chain.from_iterable(self.ordering))
+            else:
+                table = tuple(self.children_by_reference.keys())
+            self._well_table = (split, table)
+        return self._well_table[1]
 
     def _parse_wells_to_and_length(self, *args, **kwargs):
         start = args[0] if len(args) else 0
@@ -670,12 +847,8 @@ class Container(Placeable):
         step = kwargs.get('step', 1)
         length = kwargs.get('length', 1)
 
-        wrapped_wells = [
-            w
-            for i in range(3)
-            for w in self.get_children_list()
-        ]
-        total_kids = len(self.get_children_list())
+        wells = self._children_table()
+        total_kids = len(wells)
 
         if isinstance(start, str):
             start = self.get_index_from_name(start)
@@ -688,14 +861,22 @@ class Container(Placeable):
             elif stop < start:
                 stop -= 1
                 step = step * -1 if step > 0 else step
-            return WellSeries(
-                wrapped_wells[start + total_kids:stop + total_kids:step])
+            positions = self._wrapped_range(
+                start + total_kids, stop + total_kids, step)
         else:
             if length < 0:
                 length *= -1
                 step = step * -1 if step > 0 else step
-            return WellSeries(
-                wrapped_wells[start + total_kids::step][:length])
+            positions = self._wrapped_range(
+                start + total_kids, None, step)[:length]
+        return WellSeries([wells[i % total_kids] for i in positions])
+
+    def _wrapped_range(self, start, stop, step):
+        """
+        Indexes selected by slicing the children list repeated three times,
+        without building that list; map them back with `i % len(self)`
+        """
+        return range(*slice(start, stop, step).indices(3 * len(self)))
 
     def _parse_wells_x_y(self, *args, **kwargs):
         x = kwargs.get('x', None)
@@ -731,6 +912,7 @@ class WellSeries(Container):
             self.values = wells
         self.offset = 0
         self.name = name
+        self._child_positions = None
 
     def set_offset(self, offset):
         """
@@ -761,14 +943,180 @@ class WellSeries(Container):
             return str(self)
         return str(self.name)
 
+    def coordinates(self, reference=None):
+        return self.values[self.offset].coordinates(reference)
+
     def get_name_by_instance(self, well):
         for name, value in self.items.items():
             if value is well:
                 return name
         return None
 
+    def _children_table(self):
+        return self.values
+
     def get_children_list(self):
         return list(self.values)
 
     def get_child_by_name(self, name):
         return self.items.get(name)
+
+
+def _grid_columns(names, ordering):
+    """
+    Returns the columns of the grid of wells named <names> as OrderedDicts
+    of {row: (row, column)}, following <ordering> if it is not None
+    """
+    columns = OrderedDict()
+    if ordering is not None:
+        # implementing this for compatibility, but new refactors and
+        # features should use `ordering` directly
+        for i, col in enumerate(ordering):
+            col_idx = str(i + 1)
+            columns[col_idx] = OrderedDict()
+            for well in col:
+                row_idx = well[0]
+                columns[col_idx][row_idx] = (row_idx, col_idx)
+    else:
+        index_pattern = r'^([A-Za-z]+)([0-9]+)$'
+        for name in names:
+            match = re.match(index_pattern, name)
+            if match:
+                row, col = match.groups(0)
+                if col not in columns:
+                    columns[col] = OrderedDict()
+                columns[col][row] = (row, col)
+
+    return columns
+
+
+def _transpose(rows):
+    res = OrderedDict()
+    for row, cols in rows.items():
+        for col, cell in cols.items():
+            if col not in res:
+                res[col] = OrderedDict()
+            res[col][row] = cell
+    return res
+
+
+# A row or column: its name, the names of its cells, {cell name: position}
+# and the index of each cell's well in the container's well table
+_GridLine = namedtuple('_GridLine', ['name', 'cells', 'positions', 'indexes'])
+# All rows or all columns: the lines, their names and {name: position}
+_GridAxis = namedtuple('_GridAxis', ['lines', 'names', 'positions'])
+
+
+@functools.lru_cache(maxsize=GRID_LAYOUT_CACHE_SIZE)
+def _grid_layout_for(names, ordering):
+    """
+    Returns the (columns, rows) :_GridAxis: of a container whose well table
+    holds the wells named <names>, in that order. <ordering> is the tuple of
+    columns with split labware definitions, otherwise None
+    """
+    table = {name: i for i, name in enumerate(names)}
+
+    def axis(matrix):
+        lines = tuple(
+            _GridLine(
+                line,
+                tuple(cells),
+                {name: i for i, name in enumerate(cells)},
+                tuple(table[''.join(cell)] for cell in cells.values()))
+            for line, cells in matrix.items())
+        line_names = tuple(line.name for line in lines)
+        return _GridAxis(
+            lines, line_names, {name: i for i, name in enumerate(line_names)})
+
+    columns = _grid_columns(names, ordering)
+    return axis(columns), axis(_transpose(columns))
+
+
+class _LineWells(Sequence):
+    """
+    Wells of a :_GridLine:, read from the container's well table
+    """
+    __slots__ = ('_wells', '_line')
+
+    def __init__(self, wells, line):
+        self._wells = wells
+        self._line = line
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._wells[i] for i in self._line.indexes[index]]
+        return self._wells[self._line.indexes[index]]
+
+    def __len__(self):
+        return len(self._line.indexes)
+
+
+class _GridLines(Sequence):
+    """
+    Line WellSeries of a :_GridAxis:, each created on first access
+    """
+    __slots__ = ('_wells', '_axis', '_series')
+
+    def __init__(self, wells, axis):
+        self._wells = wells
+        self._axis = axis
+        self._series = [None] * len(axis.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        series = self._series[index]
+        if series is None:
+            line = self._axis.lines[index]
+            values = _LineWells(self._wells, line)
+            series = self._series[index] = _series_view(
+                values, _Names(values, line.cells, line.positions), line.name)
+        return series
+
+    def __len__(self):
+        return len(self._axis.lines)
+
+
+class _Names(Mapping):
+    """
+    {name: item} view of a sequence, given its <names> and their <positions>
+    """
+    __slots__ = ('_values', '_names', '_positions')
+
+    def __init__(self, values, names, positions):
+        self._values = values
+        self._names = names
+        self._positions = positions
+
+    def __getitem__(self, name):
+        return self._values[self._positions[name]]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def _series_view(values, items, name=None):
+    """
+    Returns a WellSeries over the <values> sequence and <items> mapping
+    without copying either
+    """
+    series = WellSeries.__new__(WellSeries)
+    series.items = items
+    series.values = values
+    series.offset = 0
+    series.name = name
+    series._child_positions = None
+    return series
+
+
+def _grid_series(wells, axis):
+    """
+    Returns the rows or columns (<axis>) of a container with the well table
+    <wells> as a WellSeries of WellSeries, indexing into <wells> through the
+    shared :_grid_layout_for: instead of holding copies of them
+    """
+    lines = _GridLines(wells, axis)
+    return _series_view(lines, _Names(lines, axis.names, axis.positions))
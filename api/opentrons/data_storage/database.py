@@ -1,6 +1,11 @@
 # pylama:ignore=E252
+import atexit
+import functools
 import sqlite3
+import threading
+import weakref
 # import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List
 from opentrons.containers.placeable import Container, Well
 from opentrons.data_storage import database_queries as db_queries
@@ -16,9 +21,66 @@ database_path = environment.get_path('DATABASE_FILE')
 if not fflags.split_labware_definitions():
     log.debug("Database path: {}".format(database_path))
 
+# Journal mode set on every connection, WAL lets loads run alongside a write
+journal_mode = 'WAL'
+
+
+class _ThreadConnections:
+    """
+    Open connections of one thread, by database path
+    """
+    __slots__ = ('by_path', '__weakref__')
+
+    def __init__(self):
+        self.by_path = {}
+
+
+# Each thread reuses its own connection (and the statements sqlite3 caches on
+# it) until the thread ends, which closes it, or close_connections() is
+# called, which happens on exit and when the database changes
+_local = threading.local()
+# The _ThreadConnections of every running thread that opened one
+_thread_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+
+# Labware parsed from json definitions, by name: (definition stamp, prototype).
+# Prototypes are never handed out, `load_labware` returns clones of them
+_labware_cache = {}
+# The same prototypes by (definition content hash, offset), shared by every
+# name with the same definition and offset
+_labware_prototypes = {}
+_labware_cache_stats = {'hits': 0, 'misses': 0}
+
+# Saves started by save_new_container_async that are not done yet, by
+# container name. They run one at a time on a single worker thread
+_pending_saves = {}
+_pending_saves_lock = threading.Lock()
+_save_executor = ThreadPoolExecutor(max_workers=1)
+
 # ======================== Private Functions ======================== #
 
 
+def _get_db_connection() -> sqlite3.Connection:
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = _ThreadConnections()
+        with _connections_lock:
+            _thread_connections.add(connections)
+    db_conn = connections.by_path.get(database_path)
+    if db_conn is None:
+        # Only ever used by the thread that opened it, but may be closed from
+        # another one by close_connections()
+        db_conn = sqlite3.connect(database_path, check_same_thread=False)
+        if journal_mode:
+            try:
+                db_conn.execute('PRAGMA journal_mode={}'.format(journal_mode))
+            except sqlite3.Error as e:
+                log.debug("Could not set journal mode of {}: {}".format(
+                    database_path, e))
+        connections.by_path[database_path] = db_conn
+    return db_conn
+
+
 def _parse_container_obj(container: Container):
     # Note: in the new labware system, container coordinates are always (0,0,0)
     return dict(zip('xyz', container._coordinates))
@@ -44,24 +106,29 @@ def _parse_well_obj(well: Well):
 
 
 def _create_container_obj_in_db(db, container: Container, container_name: str):
-    db_queries.create_container(
-        db, container_name, **_parse_container_obj(container)
+    well_columns = (
+        'location', 'x', 'y', 'z',
+        'depth', 'volume', 'diameter', 'length', 'width')
+    wells = [
+        tuple(well_data[column] for column in well_columns)
+        for well_data in map(_parse_well_obj, container)
+    ]
+    db_queries.create_container_with_wells(
+        db, container_name, wells=wells, **_parse_container_obj(container)
     )
-    for well in iter(container):
-        _create_well_obj_in_db(db, container_name, well)
 
 
 def _load_container_object_from_db(db, container_name: str):
-    db_data = db_queries.get_container_by_name(db, container_name)
-    if not db_data:
+    rows = db_queries.get_container_with_wells(
+        db, container_name, row_factory=_container_well_row)
+    if not rows:
         raise ValueError(
             "No container with name {} found in Containers database"
             .format(container_name)
         )
 
-    container_type, *rel_coords = db_data
-    wells = db_queries.get_wells_by_container_name(db, container_name)
-    if not wells:
+    container_type, rel_coords, first_well = rows[0]
+    if first_well is None:
         raise ResourceWarning(
             "No wells for container {} found in ContainerWells database"
             .format(container_name)
@@ -71,8 +138,8 @@ def _load_container_object_from_db(db, container_name: str):
     container.properties['type'] = container_type
     container._coordinates = Vector(rel_coords)
     log.debug("Loading {} with coords {}".format(rel_coords, container_type))
-    for well in wells:
-        container.add(*_load_well_object_from_db(db, well))
+    for _, _, well in rows:
+        container.add(*well)
     return container
 
 
@@ -88,33 +155,38 @@ def _update_container_object_in_db(db, container: Container):
 
 
 def _delete_container_object_in_db(db, container_name: str):
-    db_queries.delete_wells_by_container_name(db, container_name)
-    db_queries.delete_container(db, container_name)
+    db_queries.delete_container_with_wells(db, container_name)
 
 
-def _create_well_obj_in_db(db, container_name: str, well: Well):
-    well_data = _parse_well_obj(well)
-    db_queries.insert_well_into_db(
-        db_conn=db, container_name=container_name, **well_data
-    )
-
-
-def _load_well_object_from_db(db, well_data):
-    container_name, location, x, y, z, \
-        depth, volume, diameter, length, width = well_data
-
+@functools.lru_cache(maxsize=256)
+def _well_geometry(depth, volume, diameter, length, width):
     props = zip(['depth', 'total-liquid-volume',
                  'diameter', 'length', 'width'],
                 [depth, volume, diameter, length, width])
     property_dict = {k: v for k, v in props if v}
-    well = Well(properties=property_dict)
+    return Well(properties=property_dict).properties
+
+
+def _container_well_row(cursor, row):
+    """
+    Row factory for `db_queries.get_container_with_wells`, builds
+    (container type, container coordinates, (well, location, coordinates))
+    with None in place of the well for a container without wells
+    """
+    container_type, c_x, c_y, c_z, container_name, location, x, y, z, \
+        depth, volume, diameter, length, width = row
+    if location is None:
+        return container_type, (c_x, c_y, c_z), None
+
+    well = Well(properties=_well_geometry(
+        depth, volume, diameter, length, width))
     # subtract half the size, because
     # Placeable assigns X-Y to bottom-left corner,
     # but db assigns X-Y to well center
     x -= (well.x_size() / 2)
     y -= (well.y_size() / 2)
     well_coordinates = (x, y, z)
-    return (well, location, well_coordinates)
+    return container_type, (c_x, c_y, c_z), (well, location, well_coordinates)
 
 
 def _list_all_containers_by_name(db):
@@ -140,12 +212,10 @@ def _get_db_version(db):
 
 
 def _calculate_offset(labware: Container) -> dict:
-    new_definition = serializers.labware_to_json(labware)
-    base_definition = ldef.load_json(
-        new_definition['metadata']['name'], with_offset=False)
-    first_well = list(base_definition['wells'].keys())[0]
-    base_well = base_definition['wells'][first_well]
-    new_well = new_definition['wells'][first_well]
+    # Only the first well of the definition is compared, so only that well
+    # is read and serialized
+    first_well, base_well = ldef.load_first_well(labware.get_name())
+    new_well = serializers.well_to_json(labware.children_by_name[first_well])
 
     slot_coords = labware.parent.coordinates()
 
@@ -165,30 +235,102 @@ def save_new_container(container: Container, container_name: str) -> bool:
         # warnings.warn('save_new_container is deprecated, please use save_labware')  # noqa
         res = save_labware(container, container_name)
     else:
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         _create_container_obj_in_db(db_conn, container, container_name)
         res = True  # old create fn does not return anything
     return res
 
 
+def save_new_container_async(container: Container, container_name: str):
+    """
+    Saves <container> like `save_new_container`, on a background thread.
+    Returns a `concurrent.futures.Future` of the result. Loading or listing
+    containers waits for pending saves, errors are logged
+
+    <container> must not be modified until the save is done
+    """
+    future = _save_executor.submit(
+        save_new_container, container, container_name)
+    with _pending_saves_lock:
+        _pending_saves[container_name] = future
+
+    def done(future):
+        with _pending_saves_lock:
+            if _pending_saves.get(container_name) is future:
+                del _pending_saves[container_name]
+        if future.exception() is not None:
+            log.error("Saving container {} failed: {!r}".format(
+                container_name, future.exception()))
+
+    future.add_done_callback(done)
+    return future
+
+
+def wait_for_saves(container_name: str=None):
+    """
+    Waits until the pending saves of <container_name> (of all containers if
+    None) are done
+    """
+    with _pending_saves_lock:
+        if container_name is None:
+            futures = list(_pending_saves.values())
+        elif container_name in _pending_saves:
+            futures = [_pending_saves[container_name]]
+        else:
+            futures = []
+    wait(futures)
+
+
 def save_labware(labware: Container, labware_name: str) -> bool:
-    definition = serializers.container_to_json(labware, labware_name)
-    return ldef.save_user_definition(definition)
+    _labware_cache.pop(labware_name, None)
+    return ldef.save_user_definition_json(
+        labware_name, serializers.iter_labware_json(labware, labware_name))
 
 
 def load_container(container_name: str) -> Container:
+    wait_for_saves(container_name)
     if fflags.split_labware_definitions():
         # warnings.warn('save_new_container is deprecated, please use save_labware')  # noqa
         res = load_labware(container_name)
     else:
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         res = _load_container_object_from_db(db_conn, container_name)
     return res
 
 
 def load_labware(labware_name: str) -> Container:
-    jdef = ldef.load_json(labware_name)
-    return serializers.json_to_labware(jdef)
+    stamp = ldef.definition_stamp(labware_name)
+    cached = _labware_cache.get(labware_name)
+    if cached is not None and cached[0] == stamp:
+        _labware_cache_stats['hits'] += 1
+        prototype = cached[1]
+    else:
+        _labware_cache_stats['misses'] += 1
+        offset = ldef.load_offset(labware_name)
+        key = (
+            ldef.definition_hash(labware_name),
+            tuple(offset.get(axis) for axis in 'xyz'))
+        prototype = _labware_prototypes.get(key)
+        if prototype is None:
+            jdef = ldef.load_json(labware_name)
+            prototype = serializers.json_to_labware(jdef)
+            _labware_prototypes[key] = prototype
+        _labware_cache[labware_name] = (stamp, prototype)
+    return serializers.clone_labware(prototype)
+
+
+def labware_cache_info() -> dict:
+    """
+    Hits and misses of the labware definition cache used by `load_labware`,
+    and how many definitions it currently holds
+    """
+    return dict(_labware_cache_stats, size=len(_labware_cache))
+
+
+def clear_labware_cache():
+    _labware_cache.clear()
+    _labware_prototypes.clear()
+    _labware_cache_stats.update(hits=0, misses=0)
 
 
 def overwrite_container(container: Container) -> bool:
@@ -198,7 +340,7 @@ def overwrite_container(container: Container) -> bool:
     else:
         log.debug("Overwriting container definition: {}".format(
             container.get_type()))
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         _update_container_object_in_db(db_conn, container)
         res = True  # old overwrite fn does not return anything
     return res
@@ -209,6 +351,7 @@ def save_labware_offset(labware: Container, labware_name: str=None) -> bool:
         labware_name = labware.get_name()
     offset = _calculate_offset(labware)
     log.debug("Saving offset {} for {}".format(offset, labware_name))
+    _labware_cache.pop(labware_name, None)
     return ldef.save_labware_offset(labware_name, offset)
 
 
@@ -216,18 +359,19 @@ def delete_container(container_name) -> bool:
     if fflags.split_labware_definitions():
         raise NotImplementedError  # What should delete do in the new system?
     else:
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         _delete_container_object_in_db(db_conn, container_name)
         res = True  # old delete fn does not return anything
     return res
 
 
 def list_all_containers() -> List[str]:
+    wait_for_saves()
     if fflags.split_labware_definitions():
         # warnings.warn('list_all_containers is deprecated, please use list_all_labware')  # noqa
         res = list_all_labware()
     else:
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         res = _list_all_containers_by_name(db_conn)
     return res
 
@@ -240,7 +384,7 @@ def load_module(module_name: str) -> Container:
     if fflags.split_labware_definitions():
         raise NotImplementedError
     else:
-        db_conn = sqlite3.connect(database_path)
+        db_conn = _get_db_connection()
         res = _load_module_dict_from_db(db_conn, module_name)
     return res
 
@@ -250,15 +394,34 @@ def change_database(db_path: str):
     if fflags.split_labware_definitions():
         # warnings.warn('database operations no longer have an effect')
         pass
+    if db_path != database_path:
+        close_connections()
     database_path = db_path
 
 
+def close_connections():
+    """
+    Closes the database connections of all threads, they are reopened on
+    next use
+    """
+    connections = []
+    with _connections_lock:
+        for thread_connections in list(_thread_connections):
+            connections.extend(thread_connections.by_path.values())
+            thread_connections.by_path.clear()
+    for db_conn in connections:
+        db_conn.close()
+
+
+atexit.register(close_connections)
+
+
 def get_version():
     '''Get the Opentrons-defined database version'''
     if fflags.split_labware_definitions():
         # warnings.warn('database operations no longer have an effect')
         pass
-    db_conn = sqlite3.connect(database_path)
+    db_conn = _get_db_connection()
     return _get_db_version(db_conn)
 
 
@@ -266,7 +429,7 @@ def set_version(version):
     if fflags.split_labware_definitions():
         # warnings.warn('database operations no longer have an effect')
         pass
-    db_conn = sqlite3.connect(database_path)
+    db_conn = _get_db_connection()
     db_queries.set_user_version(db_conn, version)
 
 # ======================== END Public Functions ======================== #
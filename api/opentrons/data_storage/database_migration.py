@@ -1,4 +1,5 @@
 import sqlite3
+from opentrons.containers.placeable import shared_geometry
 from opentrons.data_storage import database
 from opentrons.data_storage.old_container_loading import \
     load_all_containers_from_disk, \
@@ -6,7 +7,8 @@ from opentrons.data_storage.old_container_loading import \
     get_persisted_container
 from opentrons.util import environment
 from opentrons.data_storage.schema_changes import \
-    create_table_ContainerWells, create_table_Containers
+    create_table_ContainerWells, create_table_Containers, \
+    create_index_ContainerWells_container_name
 from opentrons.util.vector import Vector
 
 
@@ -25,8 +27,8 @@ def flip_wells(wells):
         x, y, z = well._coordinates
         well._coordinates = Vector(x, opposite_offset, 0)
         length, width = (well.properties['length'], well.properties['width'])
-        well.properties['length'] = width
-        well.properties['width'] = length
+        well.properties = shared_geometry(
+            dict(well.properties, length=width, width=length))
 
 
 def rotate_container_for_alpha(container):
@@ -81,3 +83,9 @@ def check_version_and_perform_necessary_migrations():
         execute_schema_change(conn, create_table_Containers)
         migrate_containers_and_wells()
         database.set_version(1)
+        db_version = 1
+    if db_version == 1:
+        execute_schema_change(
+            conn, create_index_ContainerWells_container_name)
+        database.set_version(2)
+    conn.close()
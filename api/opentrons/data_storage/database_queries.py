@@ -33,6 +33,51 @@ def create_container(db_conn, container_name, x, y, z):
         )
 
 
+def create_container_with_wells(db_conn, container_name, x, y, z, wells):
+    """
+    Inserts a container and all of its wells (tuples in ContainerWells
+    column order, without container_name) in a single transaction
+    """
+    with db_conn:
+        db_conn.execute(
+            'INSERT INTO Containers VALUES (?, ?, ?, ?)',
+            (container_name, x, y, z,)
+        )
+        db_conn.executemany(
+            'INSERT INTO ContainerWells VALUES (?,?,?,?,?,?,?,?,?,?)',
+            ((container_name,) + tuple(well) for well in wells)
+        )
+
+
+def get_container_with_wells(db_conn, container_name, row_factory=None):
+    """
+    Returns one row per well of the container, with the container's columns
+    first (relative_x/y/z as container_x/y/z) and the ContainerWells columns
+    after, in the order wells were inserted. A container without wells gives
+    a single row with NULL well columns, an unknown one no rows.
+
+    :param row_factory: used to build each row instead of a tuple
+    """
+    cursor = db_conn.cursor()
+    cursor.row_factory = row_factory
+    cursor.execute(
+        '''
+        SELECT Containers.name,
+            Containers.relative_x AS container_x,
+            Containers.relative_y AS container_y,
+            Containers.relative_z AS container_z,
+            ContainerWells.*
+        FROM Containers
+        LEFT JOIN ContainerWells
+            ON ContainerWells.container_name = Containers.name
+        WHERE Containers.name=?
+        ORDER BY ContainerWells.rowid
+        ''',
+        (container_name,)
+    )
+    return cursor.fetchall()
+
+
 def get_container_by_name(db_conn, container_name):
     with db_conn:
         cursor = db_conn.cursor()
@@ -65,6 +110,18 @@ def delete_container(db_conn, container_name):
         )
 
 
+def delete_container_with_wells(db_conn, container_name):
+    with db_conn:
+        db_conn.execute(
+            'DELETE FROM ContainerWells WHERE container_name=?',
+            (container_name,)
+        )
+        db_conn.execute(
+            'DELETE FROM Containers WHERE name=?',
+            (container_name,)
+        )
+
+
 # ------------ END Container Functions -----------#
 
 
@@ -0,0 +1,376 @@
+"""
+Compiled bundle of the default labware definitions.
+
+Parsing every json file in the default definition directory is repeated by
+server startup and by every protocol simulation, even though that directory
+never changes on a robot. This module compiles the whole directory into a
+single file, which `labware_definitions` memory-maps and reads definitions
+from without any json parsing per lookup. User definitions and offsets are
+still read from their own directories and applied on top.
+
+Build the bundle next to the definition directory with:
+
+    build_labware_bundle.py /etc/labware
+
+(compute/scripts, which loads this module without importing the opentrons
+package) which writes /etc/labware.bundle. The bundle records the modification time
+and size of every definition file, and is ignored once a file is added,
+removed or modified.
+
+File layout (all integers little endian):
+
+    magic (8 bytes) | header length (uint64) | header (utf-8 json)
+    | padding to 8 bytes | data
+
+The header is read once when the bundle is opened and holds the stamps of
+the definition files and the index: for each labware its metadata, the range
+of its wells in the columns below, the lengths of its ordering columns and
+its `content_hash`. Labware with the same content share their wells and
+ordering in the data, and the index also holds any well properties that are
+not numeric `PROPERTIES` by well name. Data holds one float64 column per well property (NaN
+when a well does not have it), the well names as a single NUL-separated utf-8
+blob and the ordering as int32 well positions.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from itertools import chain
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'OTLWB004'
+_HEAD = struct.Struct('<8sQ')
+BUNDLE_EXTENSION = '.bundle'
+
+# Properties stored as columns, other well keys (and values that are not
+# numbers) are kept in the header
+PROPERTIES = (
+    'x', 'y', 'z', 'depth', 'diameter', 'total-liquid-volume',
+    'width', 'length', 'height')
+
+
+def bundle_path(definition_dir: str) -> str:
+    """
+    Where the bundle of <definition_dir> lives (next to it)
+    """
+    return definition_dir.rstrip(os.sep) + BUNDLE_EXTENSION
+
+
+def _canonical(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def content_hash(definition: dict) -> str:
+    """
+    Canonical hash of the content of <definition>: its wells (in order) and
+    ordering, but not its metadata. Definitions that describe the same
+    labware get the same hash whatever their name, key order within wells or
+    number formatting (10 and 10.0)
+    """
+    wells = [
+        [well_name, sorted(
+            (prop, _canonical(value)) for prop, value in well.items())]
+        for well_name, well in definition['wells'].items()]
+    canonical = json.dumps(
+        [wells, definition['ordering']], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _file_stamp(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _source_stamps(definition_dir: str) -> dict:
+    """
+    Stamp of each definition file in <definition_dir>, by file name
+    """
+    return {
+        filename: _file_stamp(os.path.join(definition_dir, filename))
+        for filename in sorted(os.listdir(definition_dir))
+        if filename.endswith('.json')
+    }
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _add_definition(filename: str, definition: dict, columns: dict,
+                    names: list, ordering: list) -> dict:
+    """
+    Appends the wells and ordering of <definition> to the data and returns
+    their ranges (and the wells' other properties) for the index
+    """
+    start = len(names)
+    positions = {}
+    extra = {}
+    for well_name, well in definition['wells'].items():
+        other = {
+            prop: value for prop, value in well.items()
+            if prop not in PROPERTIES or not _is_number(value)}
+        if other:
+            extra[well_name] = other
+        positions[well_name] = len(names) - start
+        names.append(well_name)
+        for prop in PROPERTIES:
+            value = well.get(prop, np.nan)
+            columns[prop].append(np.nan if prop in other else value)
+    if extra:
+        log.warning('{}: well properties {} are not bundle columns'.format(
+            filename, sorted(set(chain.from_iterable(extra.values())))))
+
+    ordering_start = len(ordering)
+    for column in definition['ordering']:
+        ordering.extend(positions[well_name] for well_name in column)
+    return {
+        'wells': [start, len(names)],
+        'ordering': [
+            ordering_start, [len(col) for col in definition['ordering']]],
+        'extra': extra
+    }
+
+
+def _write(path: str, header: dict, columns: dict, names: list,
+           ordering: list) -> None:
+    name_blob = '\0'.join(names).encode('utf-8')
+    arrays = [(prop, np.array(columns[prop], dtype='<f8'))
+              for prop in PROPERTIES]
+    arrays.append(('ordering', np.array(ordering, dtype='<i4')))
+    arrays.append(('names', np.frombuffer(name_blob, dtype='u1')))
+
+    layout = {}
+    offset = 0
+    for name, array in arrays:
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset += array.nbytes
+        offset += -offset % 8
+    header = json.dumps(
+        dict(header, count=len(names), columns=layout)).encode('utf-8')
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as bundle_f:
+        bundle_f.write(_HEAD.pack(MAGIC, len(header)))
+        bundle_f.write(header)
+        bundle_f.write(b'\0' * (-(_HEAD.size + len(header)) % 8))
+        for name, array in arrays:
+            bundle_f.write(array.tobytes())
+            bundle_f.write(b'\0' * (-array.nbytes % 8))
+    os.replace(tmp_path, path)
+
+
+def build(definition_dir: str, path: str=None) -> str:
+    """
+    Compiles every definition in <definition_dir> into a bundle at <path>
+    (by default see `bundle_path`) and returns the path
+    """
+    if path is None:
+        path = bundle_path(definition_dir)
+    # Stamped before reading, so a file changed meanwhile makes it stale
+    sources = _source_stamps(definition_dir)
+
+    index = {}
+    by_hash = {}
+    columns = {prop: [] for prop in PROPERTIES}
+    names = []
+    ordering = []
+    for filename in sources:
+        with open(os.path.join(definition_dir, filename)) as defn_f:
+            definition = json.load(defn_f)
+        # Labware with the same content share their wells and ordering
+        digest = content_hash(definition)
+        if digest not in by_hash:
+            by_hash[digest] = _add_definition(
+                filename, definition, columns, names, ordering)
+        index[os.path.splitext(filename)[0]] = dict(
+            by_hash[digest], metadata=definition['metadata'], hash=digest)
+
+    _write(path, {'sources': sources, 'labware': index},
+           columns, names, ordering)
+    return path
+
+
+class LabwareBundle:
+    """
+    Read-only view of a bundle written by `build`. Columns are numpy arrays
+    over the memory-mapped file
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as bundle_f:
+            self._map = mmap.mmap(
+                bundle_f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _HEAD.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('{} is not a labware bundle'.format(path))
+        header = json.loads(
+            self._map[_HEAD.size:_HEAD.size + header_len].decode('utf-8'))
+        data = _HEAD.size + header_len
+        data += -data % 8
+
+        # Stamp of each definition file the bundle was built from
+        self.sources = header['sources']
+        self._labware = header['labware']
+        self._columns = {
+            name: np.frombuffer(
+                self._map, dtype=dtype, count=count, offset=data + offset)
+            for name, (offset, dtype, count) in header['columns'].items()
+        }
+        # Byte offset of each well name in the names blob
+        blob = self._columns['names']
+        self._name_starts = np.concatenate((
+            [0], np.flatnonzero(blob == 0) + 1, [len(blob) + 1]))
+
+    def __contains__(self, labware_name: str) -> bool:
+        return labware_name in self._labware
+
+    def __len__(self) -> int:
+        return len(self._labware)
+
+    def names(self) -> list:
+        return list(self._labware)
+
+    def well_names(self, labware_name: str) -> list:
+        start, stop = self._labware[labware_name]['wells']
+        if start == stop:
+            return []
+        first, last = self._name_starts[start], self._name_starts[stop] - 1
+        return self._columns['names'][first:last].tobytes() \
+            .decode('utf-8').split('\0')
+
+    def content_hash(self, labware_name: str) -> str:
+        """
+        Returns the `content_hash` of <labware_name>, computed when the
+        bundle was built
+        """
+        return self._labware[labware_name]['hash']
+
+    def is_current(self, definition_dir: str, labware_name: str) -> bool:
+        """
+        Whether the definition file of <labware_name> in <definition_dir> is
+        unchanged since the bundle was built
+        """
+        filename = '{}.json'.format(labware_name)
+        try:
+            stamp = _file_stamp(os.path.join(definition_dir, filename))
+        except OSError:
+            return False
+        return self.sources.get(filename) == stamp
+
+    def well(self, labware_name: str, position: int=0) -> tuple:
+        """
+        Returns the name and definition of the well at <position> (in file
+        order) of <labware_name>, reading only that well
+        """
+        start, stop = self._labware[labware_name]['wells']
+        index = start + position
+        if not start <= index < stop:
+            raise IndexError(position)
+        first, last = self._name_starts[index], self._name_starts[index + 1]
+        well_name = self._columns['names'][first:last - 1].tobytes() \
+            .decode('utf-8')
+        well = {}
+        for prop in PROPERTIES:
+            value = float(self._columns[prop][index])
+            if value == value:  # not NaN
+                well[prop] = value
+        well.update(self._labware[labware_name]['extra'].get(well_name, {}))
+        return well_name, well
+
+    def columns(self, labware_name: str) -> dict:
+        """
+        Returns the property columns of <labware_name>'s wells as numpy
+        arrays (views into the bundle, NaN where a well has no value)
+        """
+        start, stop = self._labware[labware_name]['wells']
+        return {
+            prop: self._columns[prop][start:stop] for prop in PROPERTIES}
+
+    def definition(self, labware_name: str) -> dict:
+        """
+        Returns the definition of <labware_name> in the same form as its
+        json file, or an empty dict if it is not in the bundle
+        """
+        entry = self._labware.get(labware_name)
+        if entry is None:
+            return {}
+        names = self.well_names(labware_name)
+        values = [
+            (prop, column.tolist())
+            for prop, column in self.columns(labware_name).items()]
+
+        wells = {}
+        for i, well_name in enumerate(names):
+            wells[well_name] = {
+                prop: column[i]
+                for prop, column in values
+                if column[i] == column[i]  # not NaN
+            }
+            wells[well_name].update(entry['extra'].get(well_name, {}))
+
+        ordering_start, lengths = entry['ordering']
+        positions = self._columns['ordering'][
+            ordering_start:ordering_start + sum(lengths)].tolist()
+        ordering = []
+        for length in lengths:
+            ordering.append([names[i] for i in positions[:length]])
+            del positions[:length]
+
+        return {
+            'metadata': dict(entry['metadata']),
+            'wells': wells,
+            'ordering': ordering
+        }
+
+    def close(self) -> None:
+        """
+        Unmaps the file, arrays returned by `columns` must not be used after
+        """
+        self._columns.clear()
+        self._map.close()
+
+
+def open_bundle(definition_dir: str):
+    """
+    Returns the `LabwareBundle` of <definition_dir>, or None if there is no
+    bundle or a definition file was added, removed or modified since it was
+    built
+    """
+    try:
+        bundle = LabwareBundle(bundle_path(definition_dir))
+    except (OSError, ValueError):
+        return None
+    try:
+        stale = bundle.sources != _source_stamps(definition_dir)
+    except OSError:
+        stale = True
+    if stale:
+        bundle.close()
+        return None
+    return bundle
+
+
+def main(args: list) -> int:
+    """
+    Command line entry point, builds the bundle of the definition directory
+    in <args> (and to the optional path that follows it)
+    """
+    if len(args) not in (1, 2):
+        print('usage: build_labware_bundle.py '
+              '<definition dir> [<bundle path>]')
+        return 1
+    logging.basicConfig()
+    print(build(*args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
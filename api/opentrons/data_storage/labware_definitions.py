@@ -1,8 +1,10 @@
 # pylama:ignore=E252
 import os
 import json
+import logging
 from typing import List
-from opentrons.config import get_config_index
+from opentrons.config import get_config_index, file_stamp, persistence
+from opentrons.data_storage import labware_bundle
 
 """
 There will be 3 directories for json blobs to define labware:
@@ -105,6 +107,9 @@ Notes:
 """
 
 
+log = logging.getLogger(__name__)
+
+
 # Contants that use paths defined by environment variables that should be set
 # on the robot, and fall back to paths relative to this file within the source
 # repository for development purposes
@@ -123,6 +128,51 @@ def offset_dir():
     return get_config_index().get('labware', {}).get('offsetDir')
 
 
+# Compiled bundle of the default definition directory (see labware_bundle),
+# reopened only when the bundle file or the directory changes. Edited
+# definition files are caught per lookup by `_bundled`
+_bundle_cache = {'key': None, 'bundle': None}
+
+
+def _default_bundle(default_defn_dir: str):
+    """
+    Returns the `labware_bundle.LabwareBundle` of <default_defn_dir> or None
+    if it has no up to date bundle
+    """
+    if not default_defn_dir:
+        return None
+    key = (
+        default_defn_dir,
+        file_stamp(labware_bundle.bundle_path(default_defn_dir)),
+        file_stamp(default_defn_dir))
+    if key != _bundle_cache['key']:
+        bundle = None
+        if key[1] is not None:
+            bundle = labware_bundle.open_bundle(default_defn_dir)
+        _bundle_cache.update(key=key, bundle=bundle)
+    return _bundle_cache['bundle']
+
+
+def _bundled(default_defn_dir: str, labware_name: str):
+    """
+    Returns the bundle of <default_defn_dir> if it holds an up to date
+    definition of <labware_name>, otherwise None. The directory stamp does
+    not change when a file is edited in place, so the file itself is checked
+    """
+    bundle = _default_bundle(default_defn_dir)
+    if bundle is not None and labware_name in bundle and \
+            bundle.is_current(default_defn_dir, labware_name):
+        return bundle
+    return None
+
+
+def _load_default_definition(path: str, labware_name: str) -> dict:
+    bundle = _bundled(path, labware_name)
+    if bundle is None:
+        return _load_definition(path, labware_name)
+    return bundle.definition(labware_name)
+
+
 def _load_definition(path: str, labware_name: str) -> dict:
     definition_file = os.path.join(
         path, "{}.json".format(labware_name))
@@ -142,14 +192,60 @@ def _load_offset(path: str, labware_name: str) -> dict:
         path, "{}.json".format(labware_name))
     offs = {}
     try:
-        if os.path.exists(offset_file):
-            with open(offset_file) as offs_f:
-                offs = json.load(offs_f)
+        offs = persistence.read_json(offset_file)
     except FileNotFoundError:
         pass
     return offs
 
 
+# Content hashes of definition files, by path: (file stamp, hash)
+_hash_cache = {}
+
+
+def _definition_hash(default_defn_dir: str,
+                     user_defn_root_path: str,
+                     labware_name: str) -> str:
+    """
+    Returns the `labware_bundle.content_hash` of the definition `_load` uses
+    for <labware_name>, from the bundle index for default definitions and
+    otherwise hashed once per version of the file
+
+    If no definition file is found, raise a FileNotFoundException.
+    """
+    filename = "{}.json".format(labware_name)
+    user_file = os.path.join(user_defn_root_path, filename)
+    user_stamp = file_stamp(user_file)
+    if user_stamp is None:
+        bundle = _bundled(default_defn_dir, labware_name)
+        if bundle is not None:
+            return bundle.content_hash(labware_name)
+    path = user_file if user_stamp else os.path.join(
+        default_defn_dir, filename)
+    stamp = user_stamp or file_stamp(path)
+    cached = _hash_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        lw = _load_definition(os.path.dirname(path), labware_name)
+        if not lw:
+            raise FileNotFoundError
+        cached = _hash_cache[path] = (
+            stamp, labware_bundle.content_hash(lw))
+    return cached[1]
+
+
+def load_offset(labware_name: str) -> dict:
+    return _load_offset(offset_dir(), labware_name)
+
+
+def definition_hash(labware_name: str) -> str:
+    """
+    Returns a hash of the content (wells and ordering, without offset) of
+    the definition of <labware_name>, equal for any two labware with the
+    same geometry
+    """
+    return _definition_hash(
+        default_definition_dir(), user_defn_dir(), labware_name)
+
+
 def _load(default_defn_dir: str,
           user_defn_root_path: str,
           labware_name: str,
@@ -171,11 +267,17 @@ def _load(default_defn_dir: str,
     """
     lw = _load_definition(user_defn_root_path, labware_name)
     if not lw:
-        lw = _load_definition(default_defn_dir, labware_name)
+        lw = _load_default_definition(default_defn_dir, labware_name)
     if not lw:
         raise FileNotFoundError
     offs = _load_offset(offset_dir_path, labware_name) if with_offset else None
 
+    if offs and offs.get('definition') not in (None, _definition_hash(
+            default_defn_dir, user_defn_root_path, labware_name)):
+        log.warning(
+            "Offset of {} was calibrated against a different definition, "
+            "it should be calibrated again".format(labware_name))
+
     if offs:
         for well in lw['wells'].keys():
             for axis in 'xyz':
@@ -195,6 +297,43 @@ def load_json(labware_name: str, with_offset: bool=True) -> dict:
         with_offset)
 
 
+def load_first_well(labware_name: str) -> tuple:
+    """
+    Returns the name and definition (without offset) of the first well of
+    <labware_name>, which is what offsets are calculated against. Default
+    definitions are read from the bundle without decoding the other wells.
+
+    If no definition file is found, raise a FileNotFoundException.
+    """
+    lw = _load_definition(user_defn_dir(), labware_name)
+    if not lw:
+        default_defn_dir = default_definition_dir()
+        bundle = _bundled(default_defn_dir, labware_name)
+        if bundle is not None:
+            return bundle.well(labware_name)
+        lw = _load_definition(default_defn_dir, labware_name)
+    if not lw:
+        raise FileNotFoundError
+    return next(iter(lw['wells'].items()))
+
+
+def definition_stamp(labware_name: str) -> tuple:
+    """
+    Returns a value that changes whenever any of the files `load_json` reads
+    for <labware_name> (user definition, default definition, offset) is
+    created, modified or removed, including offsets not yet flushed to disk,
+    or the configured directories change
+    """
+    stamp = []
+    for path in (user_defn_dir(), default_definition_dir(), offset_dir()):
+        if path:
+            stamp.append((path, persistence.stamp(os.path.join(
+                path, "{}.json".format(labware_name)))))
+        else:
+            stamp.append((path, None))
+    return tuple(stamp)
+
+
 def _list_labware(path: str) -> List[str]:
     try:
         lw = list(map(lambda x: os.path.splitext(x)[0], os.listdir(path)))
@@ -205,7 +344,11 @@ def _list_labware(path: str) -> List[str]:
 
 def list_all_labware() -> List[str]:
     user_list = [] + _list_labware(user_defn_dir())
-    default_list = [] + _list_labware(default_definition_dir())
+    bundle = _default_bundle(default_definition_dir())
+    if bundle is None:
+        default_list = [] + _list_labware(default_definition_dir())
+    else:
+        default_list = bundle.names()
     return sorted(list(set(user_list + default_list)))
 
 
@@ -218,11 +361,19 @@ def _save_user_definition(path: str, defn: dict) -> bool:
     return True
 
 
+def _save_user_definition_json(path: str, name: str, chunks) -> bool:
+    filename = os.path.join(path, '{}.json'.format(name))
+    with open(filename, 'w') as def_file:
+        def_file.writelines(chunks)
+    return True
+
+
 def _save_offset(path: str, name: str, offset: dict):
     filename = os.path.join(
         path, '{}.json'.format(name))
-    with open(filename, 'w') as offset_file:
-        json.dump(offset, offset_file, indent=2)
+    # Offsets are saved many times during a calibration session, so writes
+    # are coalesced and written atomically by the persistence module
+    persistence.write_json(filename, offset, indent=2)
     # Once possible failures are understood, catch and return a success code
     return True
 
@@ -239,6 +390,20 @@ def save_user_definition(defn: dict) -> bool:
     return _save_user_definition(defn_dir, defn)
 
 
+def save_user_definition_json(name: str, chunks) -> bool:
+    """
+    :param name: the name of the labware
+    :param chunks: the json text of the definition in chunks, as yielded by
+        `opentrons.data_storage.serializers.iter_labware_json`, which are
+        written out as they are produced
+    :return: success code
+    """
+    defn_dir = user_defn_dir()
+    if not os.path.exists(defn_dir):
+        os.makedirs(defn_dir, exist_ok=True)
+    return _save_user_definition_json(defn_dir, name, chunks)
+
+
 def save_labware_offset(name: str, offset: dict) -> bool:
     """
     :param name: the name of the labware (most easily found in the labware
@@ -251,4 +416,10 @@ def save_labware_offset(name: str, offset: dict) -> bool:
     offset_d = offset_dir()
     if not os.path.exists(offset_d):
         os.makedirs(offset_d, exist_ok=True)
+    try:
+        # Recorded so that the offset can be told apart from one calibrated
+        # against another version of the definition
+        offset = dict(offset, definition=definition_hash(name))
+    except FileNotFoundError:
+        pass
     return _save_offset(offset_d, name, offset)
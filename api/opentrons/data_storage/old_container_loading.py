@@ -7,17 +7,28 @@
 
 import copy
 import json
+import logging
 import numbers
 import os
 import pkg_resources
 from collections import OrderedDict
+from opentrons.config import file_stamp, persistence
 from opentrons.containers.placeable import Container, Well
 from opentrons.util import environment
 from opentrons.util.vector import Vector
 
+log = logging.getLogger(__name__)
+
 persisted_containers_dict = {}
 containers_file_list = []
 
+# Contents of each json file by path: (file stamp, contents), files are only
+# parsed again once they change
+_parsed_files = {}
+# Containers read from each journal of saved custom containers, by path:
+# {'inode', 'offset' read up to, 'containers'}
+_journals = {}
+
 containers_dir_path = pkg_resources.resource_filename(
     'opentrons.config',
     'containers'
@@ -35,6 +46,7 @@ def load_containers_from_file_list(file_list):
 
 
 def load_all_containers_from_disk():
+    compact_custom_containers()
     containers_file_list.clear()
     containers_file_list.extend(
         get_custom_container_files() + [default_containers_path]
@@ -45,13 +57,104 @@ def load_all_containers_from_disk():
     )
 
 
+def _read_file(file_path):
+    stamp = file_stamp(file_path)
+    cached = _parsed_files.get(file_path)
+    if stamp is not None and cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(file_path) as f:
+        contents = json.load(f, object_pairs_hook=OrderedDict)
+    _parsed_files[file_path] = (stamp, contents)
+    return contents
+
+
 # TODO: How should we handle faulty container paths?
 def load_containers_from_file_path(file_path):
-    with open(file_path) as f:
-        persisted_containers_dict.update(json.load(
-            f,
-            object_pairs_hook=OrderedDict
-        ).get('containers', [(None, None)]))
+    persisted_containers_dict.update(
+        _read_file(file_path).get('containers', [(None, None)]))
+
+
+def _read_journal(journal_path):
+    """
+    Returns the {name: container data} saved to the journal at
+    <journal_path>, parsing only the records appended since it was last read
+    """
+    stamp = file_stamp(journal_path)
+    if stamp is None:
+        _journals.pop(journal_path, None)
+        return OrderedDict()
+    journal = _journals.get(journal_path)
+    _, size, inode = stamp
+    if journal is None or journal['inode'] != inode \
+            or size < journal['offset']:
+        journal = _journals[journal_path] = {
+            'inode': inode, 'offset': 0, 'containers': OrderedDict()}
+    if size > journal['offset']:
+        with open(journal_path, 'rb') as journal_f:
+            journal_f.seek(journal['offset'])
+            for line in journal_f:
+                if not line.endswith(b'\n'):
+                    # Still being written
+                    break
+                journal['offset'] += len(line)
+                try:
+                    name, container = json.loads(
+                        line.decode('utf-8'), object_pairs_hook=OrderedDict)
+                except ValueError:
+                    log.warning('Skipping unreadable record in {}'.format(
+                        journal_path))
+                    continue
+                journal['containers'][name] = container
+    return journal['containers']
+
+
+def save_custom_containers(data):
+    """
+    Saves the containers of a {name: container data} dict by appending them
+    to the custom containers journal, rather than rewriting the custom
+    containers file. They are moved into that file (in its existing format)
+    by `compact_custom_containers` when containers are next loaded
+    """
+    records = ''.join(
+        json.dumps([name, container]) + '\n'
+        for name, container in data.items())
+    journal_path = environment.get_path('CONTAINERS_JOURNAL_FILE')
+    with open(journal_path, 'a+b') as journal_f:
+        # Terminate a record cut short by a crash, so it is skipped alone
+        journal_f.seek(0, os.SEEK_END)
+        if journal_f.tell():
+            journal_f.seek(journal_f.tell() - 1)
+            if journal_f.read(1) != b'\n':
+                journal_f.write(b'\n')
+        journal_f.write(records.encode('utf-8'))
+        if persistence.fsync != 'never':
+            journal_f.flush()
+            os.fsync(journal_f.fileno())
+
+
+def compact_custom_containers():
+    """
+    Moves the containers saved to the journal into the custom containers
+    file, written atomically through `persistence`, then removes the journal
+    """
+    journal_path = environment.get_path('CONTAINERS_JOURNAL_FILE')
+    saved = _read_journal(journal_path)
+    if not saved:
+        return
+    container_file_path = environment.get_path('CONTAINERS_FILE')
+    contents = OrderedDict(containers=OrderedDict())
+    if os.path.isfile(container_file_path):
+        # Copied, the cached contents stay as on disk if the write fails
+        contents.update(_read_file(container_file_path))
+        contents['containers'] = OrderedDict(contents['containers'])
+    contents['containers'].update(saved)
+    persistence.write_json(container_file_path, contents, indent=4)
+    # The journal is only removed once its containers are on disk
+    persistence.flush()
+    _parsed_files[container_file_path] = (
+        file_stamp(container_file_path), contents)
+    os.remove(journal_path)
+    _journals.pop(journal_path, None)
 
 
 def get_custom_container_files():
@@ -21,3 +21,10 @@ create_table_Containers = """ CREATE TABLE Containers (
                                     relative_y INTEGER DEFAULT 0,
                                     relative_z INTEGER DEFAULT 0
                                 ); """
+
+
+# Wells are always looked up by container, keeps them in insertion (rowid)
+# order within a container
+create_index_ContainerWells_container_name = """CREATE INDEX IF NOT EXISTS
+                                ContainerWells_container_name
+                                ON ContainerWells (container_name);"""
@@ -1,4 +1,6 @@
 # pylama:ignore=E252
+import json
+
 from opentrons.containers.placeable import Well, Container
 from opentrons.util.vector import Vector
 from numbers import Number
@@ -42,33 +44,126 @@ def json_to_labware(json_defn: dict) -> Container:
     return container
 
 
-def _well_to_json(well: Well) -> dict:
-    x, y, z = map(lambda num: round(num, 3), well.coordinates())
+def clone_labware(labware: Container) -> Container:
+    """
+    Returns a new Container with the same wells, coordinates and ordering as
+    <labware> (as built by `json_to_labware`), without going through json
+    """
+    container = Container()
+    container.properties.update(labware.properties)
+    container._coordinates = labware._coordinates
+
+    for well_name, well in labware.children_by_name.items():
+        clone = Well(properties=well.properties)
+        clone._coordinates = well._coordinates
+        container.add(clone, well_name)
+    container.ordering = [list(column) for column in labware.ordering]
+
+    return container
+
+
+def _parent_trace(container: Container) -> list:
+    """
+    Relative coordinates of <container> and each of its ancestors, in the
+    order `Placeable.coordinates` sums them
+    """
+    return [p._coordinates.to_tuple() for p in container.get_trace()]
+
+
+def _well_xyz(well: Well, trace: list) -> Tuple[float, float, float]:
+    # Summed in the same order as Placeable.coordinates, so values (and
+    # their rounding) are identical to those of well.coordinates()
+    x, y, z = well._coordinates.to_tuple()
+    for dx, dy, dz in trace:
+        x, y, z = x + dx, y + dy, z + dz
+    return round(x, 3), round(y, 3), round(z, 3)
+
+
+def well_to_json(well: Well, trace: list=None) -> dict:
+    """
+    Returns the definition of a single well, with its coordinates relative
+    to the deck. <trace> (see `_parent_trace` of the well's container) can be
+    passed to avoid walking the parents for each well of a container
+    """
+    if trace is None:
+        trace = _parent_trace(well.parent)
+    x, y, z = _well_xyz(well, trace)
     well_json = {'x': x, 'y': y, 'z': z}
     well_json.update(well.properties)
     return well_json
 
 
+def iter_wells(container: Container):
+    """
+    Yields (name, definition) of each well of <container>, walking the
+    container's parents only once
+    """
+    trace = _parent_trace(container)
+    for well_name, well in container.children_by_name.items():
+        yield well_name, well_to_json(well, trace)
+
+
+def _ordering(container: Container) -> list:
+    if container.ordering:
+        return container.ordering
+    groups = {}
+    for w in container.children_by_name.keys():
+        num = int(w[1:])
+        if num in groups.keys():
+            groups[num].append(w)
+        else:
+            groups[num] = [w]
+    return [sorted(groups[idx]) for idx in sorted(groups.keys())]
+
+
+def iter_labware_json(container: Container, container_name: str=None):
+    """
+    Yields the json text of the definition of <container> in chunks (one per
+    well), equal to `json.dumps(labware_to_json(container, container_name))`
+    without building the definition dict. The properties of wells sharing a
+    geometry are encoded only once
+    """
+    if container_name is None:
+        container_name = container.get_name()
+    yield '{{"metadata": {}, "wells": {{'.format(
+        json.dumps({'name': container_name}))
+
+    trace = _parent_trace(container)
+    encoded = {}
+    separator = ''
+    for well_name, well in container.children_by_name.items():
+        properties = well.properties
+        try:
+            _, props_json = encoded[id(properties)]
+        except KeyError:
+            props_json = ''.join(
+                ', {}: {}'.format(json.dumps(key), json.dumps(value))
+                for key, value in properties.items()
+                if key not in ('x', 'y', 'z'))
+            # Keeps <properties> alive so that its id is not reused
+            encoded[id(properties)] = (properties, props_json)
+        x, y, z = _well_xyz(well, trace)
+        if 'x' in properties or 'y' in properties or 'z' in properties:
+            # Like well_to_json, the properties take precedence
+            x, y, z = [
+                properties.get(axis, value)
+                for axis, value in zip('xyz', (x, y, z))]
+        yield '{}{}: {{"x": {}, "y": {}, "z": {}{}}}'.format(
+            separator, json.dumps(well_name),
+            json.dumps(x), json.dumps(y), json.dumps(z), props_json)
+        separator = ', '
+
+    yield '}}, "ordering": {}}}'.format(json.dumps(_ordering(container)))
+
+
 def labware_to_json(container: Container, container_name: str=None) -> dict:
     if container_name is None:
         container_name = container.get_name()
     metadata = {'name': container_name}
-    wells = {
-        well_name: _well_to_json(well)
-        for well_name, well in container.children_by_name.items()}
-    if container.ordering:
-        ordering = container.ordering
-    else:
-        groups = {}
-        for w in wells.keys():
-            num = int(w[1:])
-            if num in groups.keys():
-                groups[num].append(w)
-            else:
-                groups[num] = [w]
-        ordering = [sorted(groups[idx]) for idx in sorted(groups.keys())]
-
-    return {'metadata': metadata, 'wells': wells, 'ordering': ordering}
+    wells = dict(iter_wells(container))
+    return {
+        'metadata': metadata, 'wells': wells, 'ordering': _ordering(container)
+    }
 
 
 # Aliases until we get rid of "container" nomenclature
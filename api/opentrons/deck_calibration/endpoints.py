@@ -3,6 +3,7 @@ from uuid import uuid1
 from opentrons.instruments import pipette_config
 from opentrons import instruments, robot
 from opentrons.robot import robot_configs
+from opentrons.config import persistence
 from opentrons.deck_calibration import jog, position, dots_set
 from opentrons.deck_calibration.linal import add_z, solve
 
@@ -354,6 +355,8 @@ async def release(data):
     """
     global session
     session = None
+    # Write out the calibration saved during the session
+    persistence.flush()
     robot.remove_instrument('left')
 
     robot.remove_instrument('right')
@@ -0,0 +1,176 @@
+"""
+Asyncio transport for the serial connections of the Smoothie and the
+temperature plate.
+
+Commands are written to the port and their responses are read as the event
+loop reports the port readable, so waiting for a response does not hold an
+OS thread. Ports without a file descriptor, and loops that cannot watch one
+(e.g. the Windows proactor loop), fall back to blocking reads run on the
+loop's executor. `AsyncSerial.send_command` can be awaited from any event loop.
+`serial_communication.write_and_return` is a blocking wrapper around it for
+the drivers' synchronous API.
+
+Transports created without a loop share one event loop, run by a daemon
+thread started on first use.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WRITE_TIMEOUT = 30
+
+# The shared loop and the ident of the thread running it
+_serial_loop = {'loop': None, 'thread_id': None}
+_serial_loop_lock = threading.Lock()
+
+# Transports of the connections used through `transport_for`
+_transports = weakref.WeakKeyDictionary()
+
+
+def serial_loop():
+    """
+    Returns the event loop shared by transports created without one
+    """
+    with _serial_loop_lock:
+        if _serial_loop['loop'] is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name='serial', daemon=True)
+            thread.start()
+            _serial_loop.update(loop=loop, thread_id=thread.ident)
+        return _serial_loop['loop']
+
+
+def transport_for(serial_connection):
+    """
+    Returns the `AsyncSerial` of <serial_connection> (a pyserial Serial),
+    creating it on the shared loop on first use
+    """
+    transport = _transports.get(serial_connection)
+    if transport is None:
+        transport = _transports[serial_connection] = \
+            AsyncSerial(serial_connection)
+    return transport
+
+
+def _parse_response(response, command, ack):
+    # Imported here, serial_communication imports this module
+    from opentrons.drivers.smoothie_drivers.serial_communication import \
+        _parse_smoothie_response
+    return _parse_smoothie_response(response, command, ack)
+
+
+class AsyncSerial:
+    """
+    Sends commands over a pyserial connection from an event loop, one
+    command at a time
+    """
+
+    def __init__(self, serial_connection, loop=None):
+        self._serial = serial_connection
+        if loop is None:
+            self._loop = serial_loop()
+            self._loop_thread_id = _serial_loop['thread_id']
+        else:
+            self._loop = loop
+            # Known once a command has run on <loop>
+            self._loop_thread_id = None
+        self._lock = None
+        # Whether the loop can watch the port, known once it has been tried
+        self._watch_fd = None
+        # Blocking read left running by a command that timed out
+        self._pending_read = None
+
+    @property
+    def loop(self):
+        return self._loop
+
+    async def send_command(
+            self, command, ack, timeout=DEFAULT_WRITE_TIMEOUT):
+        """
+        Writes <command> and returns the response before <ack> (with an
+        echoed command removed). Raises asyncio.TimeoutError if <ack> is not
+        received within <timeout> seconds (no limit if None)
+        """
+        if asyncio.get_event_loop() is self._loop:
+            return await self._send(command, ack, timeout)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._send(command, ack, timeout), self._loop))
+
+    def write_and_return(
+            self, command, ack, timeout=DEFAULT_WRITE_TIMEOUT):
+        """
+        Blocking `send_command`, for threads other than the loop's
+        """
+        if self._loop_thread_id == threading.get_ident():
+            raise RuntimeError(
+                'write_and_return would block the event loop it waits on, '
+                'await send_command instead')
+        return asyncio.run_coroutine_threadsafe(
+            self._send(command, ack, timeout), self._loop).result()
+
+    async def _send(self, command, ack, timeout):
+        self._loop_thread_id = threading.get_ident()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._pending_read is not None:
+                # Finished before writing, so it does not take the start of
+                # this command's response. Its data is discarded
+                await asyncio.wait([self._pending_read])
+                self._pending_read = None
+            log.debug('Write -> {}'.format(command.encode()))
+            self._serial.reset_input_buffer()
+            self._serial.write(command.encode())
+            response = await asyncio.wait_for(
+                self._read_until(ack.encode()), timeout)
+            clean_response = _parse_response(
+                response, command.encode(), ack.encode())
+            response = clean_response.decode() if clean_response else ''
+            log.debug('Read <- {}'.format(response.encode()))
+            return response
+
+    async def _read_until(self, ack):
+        response = bytearray()
+        while ack not in response:
+            waiting = self._serial.in_waiting
+            if waiting:
+                response += self._serial.read(waiting)
+            elif self._watch_fd is False:
+                response += await self._read_blocking()
+            else:
+                await self._readable()
+        return bytes(response)
+
+    async def _readable(self):
+        readable = self._loop.create_future()
+
+        def on_readable():
+            if not readable.done():
+                readable.set_result(None)
+
+        try:
+            fd = self._serial.fileno()
+            self._loop.add_reader(fd, on_readable)
+        except (AttributeError, OSError, NotImplementedError) as e:
+            log.debug('Cannot watch the serial port ({}), using blocking '
+                      'reads'.format(e))
+            self._watch_fd = False
+            return
+        self._watch_fd = True
+        try:
+            await readable
+        finally:
+            self._loop.remove_reader(fd)
+
+    async def _read_blocking(self):
+        # Returns what arrives within the port's timeout. Shielded, so that
+        # a timed out command leaves the read for the next command to await
+        read = self._pending_read = self._loop.run_in_executor(
+            None, self._serial.read, 1)
+        data = await asyncio.shield(read)
+        self._pending_read = None
+        return data
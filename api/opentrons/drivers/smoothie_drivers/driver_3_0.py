@@ -1,10 +1,13 @@
 from os import environ
+import contextlib
 import logging
 from time import sleep
 from threading import Event
 from typing import Dict
 
 from opentrons.drivers.smoothie_drivers import serial_communication
+from opentrons.drivers.smoothie_drivers.position_log import \
+    PositionLog, DEFAULT_SIZE as DEFAULT_POSITION_LOG_SIZE
 from opentrons.drivers.rpi_drivers import gpio
 from opentrons.instruments.pipette_config import configs
 '''
@@ -69,7 +72,18 @@ GCODES = {'HOME': 'G28.2',
           'WRITE_INSTRUMENT_MODEL': 'M372',
           'SET_MAX_SPEED': 'M203.1',
           'SET_CURRENT': 'M907',
-          'DISENGAGE_MOTOR': 'M18'}
+          'DISENGAGE_MOTOR': 'M18',
+          'WAIT': 'M400'}
+
+# Commands Smoothieware queues in its motion planner. In pipelined mode these
+# are streamed without waiting for motion to finish, every other command
+# (current and max speed changes, homing, probing, reads...) first waits for
+# the motion queued before it
+PLANNER_GCODES = (
+    GCODES['MOVE'],
+    GCODES['DWELL'],
+    GCODES['RELATIVE_COORDS'],
+    GCODES['ABSOLUTE_COORDS'])
 
 # Number of digits after the decimal point for coordinates being sent
 # to Smoothie
@@ -77,6 +91,10 @@ GCODE_ROUNDING_PRECISION = 3
 
 SMOOTHIE_COMMAND_TERMINATOR = 'M400\r\n\r\n'
 SMOOTHIE_ACK = 'ok\r\nok\r\n'
+# Smoothieware acks a streamed line once it is queued, and holds the ack back
+# while its planner is full
+SMOOTHIE_LINE_TERMINATOR = '\r\n'
+SMOOTHIE_LINE_ACK = 'ok\r\n'
 
 
 def _parse_axis_values(raw_axis_values):
@@ -172,8 +190,18 @@ class SmoothieDriver_3_0_0:
         self.run_flag = Event()
         self.run_flag.set()
 
+        # Stream planner commands rather than waiting for each one to finish
+        self.pipelined = \
+            environ.get('OT_SMOOTHIE_PIPELINED', '').lower() == 'true'
+        # Commands streamed since the last sync point, which may still be
+        # executing. An error they cause is only reported in the response to
+        # a later command
+        self._streamed_commands = []
+
         self._position = HOMED_POSITION.copy()
-        self.log = []
+        # Recent positions, for debugging motion
+        self.log = PositionLog(AXES, size=int(environ.get(
+            'OT_SMOOTHIE_POSITION_LOG_SIZE', DEFAULT_POSITION_LOG_SIZE)))
         self._update_position({axis: 0 for axis in AXES})
         self.simulating = True
         self._connection = None
@@ -206,6 +234,19 @@ class SmoothieDriver_3_0_0:
         # position after homing
         self._homed_position = HOMED_POSITION.copy()
 
+        # Skip current, speed and max speed commands that would not change
+        # what Smoothieware last received, and send the current changes made
+        # between two home commands (dwelling the axes just homed, activating
+        # the next ones) as a single command
+        self.optimize_commands = True
+        # Commands not sent by the optimization, by GCODES name
+        self.suppressed = {
+            'SET_CURRENT': 0, 'SET_SPEED': 0, 'SET_MAX_SPEED': 0}
+        self._forget_sent_settings()
+        self._pending_current = {}
+        self._pending_current_changes = 0
+        self._current_batch_depth = 0
+
     @property
     def homed_position(self):
         return self._homed_position.copy()
@@ -216,7 +257,7 @@ class SmoothieDriver_3_0_0:
             for axis, value in target.items() if value is not None
         })
 
-        self.log += [self._position.copy()]
+        self.log.append(self._position)
 
     def update_position(self, default=None, is_retry=False):
         if default is None:
@@ -326,6 +367,7 @@ class SmoothieDriver_3_0_0:
     def disconnect(self):
         if self._connection:
             self._connection.close()
+        self._streamed_commands = []
         self.simulating = True
 
     def is_connected(self):
@@ -392,9 +434,14 @@ class SmoothieDriver_3_0_0:
         ''' set total axes movement speed in mm/second'''
         self._combined_speed = float(value)
         speed_per_min = int(self._combined_speed * SEC_PER_MIN)
+        if self._optimizing() and speed_per_min == self._sent_speed:
+            self.suppressed['SET_SPEED'] += 1
+            return
         command = GCODES['SET_SPEED'] + str(speed_per_min)
         log.debug("set_speed: {}".format(command))
         self._send_command(command)
+        if not self.simulating:
+            self._sent_speed = speed_per_min
 
     def push_speed(self):
         self._saved_axes_speed = float(self._combined_speed)
@@ -411,6 +458,13 @@ class SmoothieDriver_3_0_0:
             and floating point number for millimeters per second (mm/sec)
         '''
         self._max_speed_settings.update(settings)
+        if self._optimizing():
+            settings = {
+                axis: value for axis, value in settings.items()
+                if self._sent_max_speed.get(axis.upper()) != value}
+            if not settings:
+                self.suppressed['SET_MAX_SPEED'] += 1
+                return
         values = ['{}{}'.format(axis.upper(), value)
                   for axis, value in sorted(settings.items())]
         command = '{} {}'.format(
@@ -419,6 +473,9 @@ class SmoothieDriver_3_0_0:
         )
         log.debug("set_axis_max_speed: {}".format(command))
         self._send_command(command)
+        if not self.simulating:
+            self._sent_max_speed.update({
+                axis.upper(): value for axis, value in settings.items()})
 
     def push_axis_max_speed(self):
         self._saved_max_speed_settings = self._max_speed_settings.copy()
@@ -439,6 +496,42 @@ class SmoothieDriver_3_0_0:
             for ax in settings.keys()
         })
         self._current_settings.update(settings)
+        if not self._optimizing():
+            self._send_current(settings)
+            return
+        with self._merged_current_changes():
+            self._pending_current.update(settings)
+            self._pending_current_changes += 1
+
+    @contextlib.contextmanager
+    def _merged_current_changes(self):
+        '''
+        Current changes made within this context are sent as one command
+        when it exits, or before any other command is sent
+        '''
+        self._current_batch_depth += 1
+        try:
+            yield
+        finally:
+            self._current_batch_depth -= 1
+            if not self._current_batch_depth:
+                self._flush_current()
+
+    def _flush_current(self):
+        pending = self._pending_current
+        changes = self._pending_current_changes
+        self._pending_current = {}
+        self._pending_current_changes = 0
+        changed = {
+            ax: value for ax, value in pending.items()
+            if self._sent_current.get(ax) != value
+        }
+        if changed:
+            changes -= 1
+            self._send_current(changed)
+        self.suppressed['SET_CURRENT'] += changes
+
+    def _send_current(self, settings):
         values = ['{}{}'.format(axis, value)
                   for axis, value in sorted(settings.items())]
         command = '{} {}'.format(
@@ -447,6 +540,8 @@ class SmoothieDriver_3_0_0:
         )
         log.debug("set_current: {}".format(command))
         self._send_command(command)
+        if not self.simulating:
+            self._sent_current.update(settings)
         self.delay(CURRENT_CHANGE_DELAY)
 
     def disengage_axis(self, axes):
@@ -519,6 +614,20 @@ class SmoothieDriver_3_0_0:
 
     # ----------- Private functions --------------- #
 
+    def _optimizing(self):
+        # Nothing reaches Smoothieware while simulating, so there is nothing
+        # to compare against
+        return self.optimize_commands and not self.simulating
+
+    def _forget_sent_settings(self):
+        '''
+        Called whenever Smoothieware's settings are unknown (on setup and
+        reset), so that the next current and speed commands are all sent
+        '''
+        self._sent_current = {}
+        self._sent_speed = None
+        self._sent_max_speed = {}
+
     def _wait_for_ack(self):
         '''
         In the case where smoothieware has just been reset, we want to
@@ -541,11 +650,22 @@ class SmoothieDriver_3_0_0:
         log.debug("reset_from_error")
         self._send_command(GCODES['RESET_FROM_ERROR'])
 
-    # Potential place for command optimization (buffering, flushing, etc)
+    def wait_for_motion(self):
+        '''
+        Blocks until commands streamed in pipelined mode are done. Needed
+        before anything that depends on the robot having stopped outside of
+        the driver, such as waiting on the host
+        '''
+        if self._streamed_commands:
+            self._send_command(GCODES['WAIT'])
+
     def _send_command(self, command, timeout=None):
         """
         Submit a GCODE command to the robot, followed by M400 to block until
-        done. This method also ensures that any command on the B or C axis
+        done. In pipelined mode, commands that go into Smoothieware's motion
+        planner (see PLANNER_GCODES) are instead streamed, returning as soon as
+        they are queued, and the next other command first waits for them.
+        This method also ensures that any command on the B or C axis
         (the axis for plunger control) do current ramp-up and ramp-down, so
         that plunger motors rest at a low current to prevent burn-out.
 
@@ -556,7 +676,10 @@ class SmoothieDriver_3_0_0:
         When a SmoothieError is raised, the user should inspect the physical
         configuration of the robot and the protocol and determine why the limit
         switch was hit unexpectedly. This is usually due to an undetected
-        collision in a previous move command.
+        collision in a previous move command. In pipelined mode, the error
+        caused by a streamed command is reported in the response to a later
+        command, so the SmoothieError also names the streamed commands that
+        were still executing.
 
         :param command: the GCODE to submit to the robot
         :param timeout: the time to wait before returning (indefinite wait if
@@ -565,18 +688,38 @@ class SmoothieDriver_3_0_0:
         if self.simulating:
             pass
         else:
-
-            command_line = command + ' ' + SMOOTHIE_COMMAND_TERMINATOR
+            if self._pending_current:
+                # Merged current changes go out before anything else
+                self._flush_current()
+            streamed = self._streamed_commands
+            if self.pipelined and command.startswith(PLANNER_GCODES):
+                command_line = command + SMOOTHIE_LINE_TERMINATOR
+                ack = SMOOTHIE_LINE_ACK
+                streamed.append(command)
+            else:
+                command_line = command + ' ' + SMOOTHIE_COMMAND_TERMINATOR
+                ack = SMOOTHIE_ACK
+                if streamed:
+                    # Sync point: let streamed moves finish first
+                    if command != GCODES['WAIT']:
+                        command_line = GCODES['WAIT'] + ' ' + command_line
+                    self._streamed_commands = []
             ret_code = serial_communication.write_and_return(
-                command_line, SMOOTHIE_ACK, self._connection, timeout=timeout)
+                command_line, ack, self._connection, timeout=timeout)
 
             # Smoothieware returns error state if a switch was hit while moving
             if (ERROR_KEYWORD in ret_code.lower()) or \
                     (ALARM_KEYWORD in ret_code.lower()):
+                # Nothing streamed before the error is run after the reset
+                self._streamed_commands = []
                 self._reset_from_error()
                 error_axis = ret_code.strip()[-1]
                 if GCODES['HOME'] not in command and error_axis in 'XYZABC':
                     self.home(error_axis)
+                if streamed:
+                    raise SmoothieError(
+                        '{} (while running streamed commands: {})'.format(
+                            ret_code.strip(), ', '.join(streamed)))
                 raise SmoothieError(ret_code)
 
             return ret_code
@@ -635,6 +778,7 @@ class SmoothieDriver_3_0_0:
 
     def _setup(self):
         log.debug("_setup")
+        self._forget_sent_settings()
         self._wait_for_ack()
         self._reset_from_error()
         self._send_command(self._config.acceleration)
@@ -793,21 +937,24 @@ class SmoothieDriver_3_0_0:
                 for group in HOME_SEQUENCE
             ]))
 
-        for axes in home_sequence:
-            if 'X' in axes:
-                self._home_x()
-            elif 'Y' in axes:
-                self._home_y()
-            else:
-                # if we are homing neither the X nor Y axes, simple home
-                command = GCODES['HOME'] + axes
-                try:
-                    self.activate_axes(axes)
-                    log.debug("home: {}".format(command))
-                    self._send_command(command, timeout=30)
-                finally:
-                    # always dwell an axis after it has been homed
-                    self.dwell_axes(axes)
+        # Dwelling the axes just homed and activating the next ones are
+        # merged into one current change
+        with self._merged_current_changes():
+            for axes in home_sequence:
+                if 'X' in axes:
+                    self._home_x()
+                elif 'Y' in axes:
+                    self._home_y()
+                else:
+                    # if we are homing neither the X nor Y axes, simple home
+                    command = GCODES['HOME'] + axes
+                    try:
+                        self.activate_axes(axes)
+                        log.debug("home: {}".format(command))
+                        self._send_command(command, timeout=30)
+                    finally:
+                        # always dwell an axis after it has been homed
+                        self.dwell_axes(axes)
 
         # Only update axes that have been selected for homing
         homed = {
@@ -854,6 +1001,8 @@ class SmoothieDriver_3_0_0:
 
     def pause(self):
         if not self.simulating:
+            # Streamed moves would otherwise keep running while paused
+            self.wait_for_motion()
             self.run_flag.clear()
 
     def resume(self):
@@ -926,6 +1075,8 @@ class SmoothieDriver_3_0_0:
         """
         log.debug("kill")
         self._smoothie_hard_halt()
+        # Halting drops whatever was streamed
+        self._streamed_commands = []
         self._reset_from_error()
         self._setup()
 
@@ -940,6 +1091,7 @@ class SmoothieDriver_3_0_0:
             sleep(0.25)
             gpio.set_high(gpio.OUTPUT_PINS['RESET'])
             sleep(0.25)
+            self._forget_sent_settings()
             self._wait_for_ack()
 
     def _smoothie_programming_mode(self):
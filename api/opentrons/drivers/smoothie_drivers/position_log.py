@@ -0,0 +1,90 @@
+"""
+Fixed-capacity history of the positions reported by the driver.
+
+The driver records its position after every move, home and position update.
+Keeping every record as a dict grew memory without bound over long or looped
+protocols, so records are kept in a NumPy ring buffer instead: one row of
+axis values and a timestamp per record, the oldest records overwritten once
+`size` is reached.
+"""
+from time import time
+
+import numpy as np
+
+DEFAULT_SIZE = 10000
+
+
+class PositionLog:
+    """
+    The last <size> positions of <axes>, oldest first. Iterating or indexing
+    gives position dicts (as the driver's `log` list used to hold), `to_arrays`
+    and `save` export the whole history
+    """
+
+    def __init__(self, axes: str, size: int=DEFAULT_SIZE) -> None:
+        if size < 1:
+            raise ValueError('size must be at least 1, not {}'.format(size))
+        self.axes = axes
+        self.size = size
+        self._positions = np.zeros((size, len(axes)))
+        self._timestamps = np.zeros(size)
+        self._next = 0
+        self._count = 0
+        # Records overwritten since the last clear
+        self.dropped = 0
+
+    def append(self, position: dict, timestamp: float=None) -> None:
+        """
+        Records the values of <position> (a dict holding every axis) at
+        <timestamp> (by default now)
+        """
+        self._positions[self._next] = [position[axis] for axis in self.axes]
+        self._timestamps[self._next] = time() if timestamp is None \
+            else timestamp
+        self._next = (self._next + 1) % self.size
+        if self._count == self.size:
+            self.dropped += 1
+        else:
+            self._count += 1
+
+    def clear(self) -> None:
+        self._next = 0
+        self._count = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _rows(self) -> np.ndarray:
+        # Buffer indices of the records, oldest first
+        return (np.arange(self._count) + self._next - self._count) % self.size
+
+    def _record(self, row) -> dict:
+        return dict(zip(self.axes, self._positions[row].tolist()))
+
+    def __getitem__(self, index: int) -> dict:
+        if not -self._count <= index < self._count:
+            raise IndexError('position log index out of range')
+        return self._record(self._rows()[index])
+
+    def __iter__(self):
+        for row in self._rows():
+            yield self._record(row)
+
+    def to_arrays(self) -> tuple:
+        """
+        Returns copies of the timestamps (shape (n,)) and the positions
+        (shape (n, len(axes)), columns in the order of `axes`), oldest first
+        """
+        rows = self._rows()
+        return self._timestamps[rows], self._positions[rows]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the history to <path> as a .npz archive holding `axes`,
+        `timestamps` and `positions`
+        """
+        timestamps, positions = self.to_arrays()
+        np.savez_compressed(
+            path, axes=np.array(list(self.axes)),
+            timestamps=timestamps, positions=positions)
@@ -1,14 +1,21 @@
+import asyncio
 import serial
 from serial.tools import list_ports
 import contextlib
 import logging
+import time
+from opentrons.drivers.smoothie_drivers import async_serial, serial_log
 
 log = logging.getLogger(__name__)
 
-RECOVERY_TIMEOUT = 10
 DEFAULT_SERIAL_TIMEOUT = 5
 DEFAULT_WRITE_TIMEOUT = 30
 
+# Multiplies the recorded latencies of connections to 'replay:<log path>'
+replay_latency_scale = 1.0
+
+_recording = {'writer': None}
+
 
 def get_ports_by_name(device_name):
     '''Returns all serial devices with a given name'''
@@ -27,16 +34,6 @@ def get_port_by_VID(vid):
             return d[0]
 
 
-@contextlib.contextmanager
-def serial_with_temp_timeout(serial_connection, timeout):
-    '''Implements a temporary timeout for a serial connection'''
-    saved_timeout = serial_connection.timeout
-    if timeout is not None:
-        serial_connection.timeout = timeout
-    yield serial_connection
-    serial_connection.timeout = saved_timeout
-
-
 def _parse_smoothie_response(response, command, ack):
     if ack in response:
         parsed_response = response.split(ack)[0]
@@ -52,26 +49,6 @@ def _parse_smoothie_response(response, command, ack):
         return None
 
 
-def clear_buffer(serial_connection):
-    serial_connection.reset_input_buffer()
-
-
-def _write_to_device_and_return(cmd, ack, device_connection):
-    '''Writes to a serial device.
-    - Formats command
-    - Wait for ack return
-    - return parsed response'''
-    device_connection.write(cmd.encode())
-
-    response = device_connection.read_until(ack.encode())
-
-    clean_response = _parse_smoothie_response(
-        response, cmd.encode(), ack.encode())
-    if clean_response:
-        return clean_response.decode()
-    return ''
-
-
 def _connect(port_name, baudrate):
     ser = serial.Serial(
         port=port_name,
@@ -82,38 +59,68 @@ def _connect(port_name, baudrate):
     return ser
 
 
-def _attempt_command_recovery(command, ack, serial_conn):
-    '''Recovery after following a failed write_and_return() atempt'''
-    with serial_with_temp_timeout(serial_conn, RECOVERY_TIMEOUT) as device:
-        response = _write_to_device_and_return(command, ack, device)
-    if response is None:
-        log.debug("No valid response during _attempt_command_recovery")
-        raise RuntimeError(
-            "Recovery attempted - no valid smoothie response "
-            "for command: {} in {} seconds".format(
-                command.encode(), RECOVERY_TIMEOUT))
-    return response
-
-
 def write_and_return(
         command, ack, serial_connection, timeout=DEFAULT_WRITE_TIMEOUT):
-    '''Write a command and return the response'''
-    log.debug('Write -> {}'.format(command.encode()))
-    clear_buffer(serial_connection)
-    with serial_with_temp_timeout(
-            serial_connection, timeout) as device_connection:
-        response = _write_to_device_and_return(command, ack, device_connection)
-    log.debug('Read <- {}'.format(response.encode()))
+    '''Write a command and return the response. Blocking wrapper around
+    the connection's `async_serial.AsyncSerial` transport; returns an empty
+    response if <ack> is not received within <timeout> (the connection's
+    timeout if None)'''
+    if timeout is None:
+        timeout = serial_connection.timeout
+    if isinstance(serial_connection, serial_log.Replay):
+        transport = serial_connection
+    else:
+        transport = async_serial.transport_for(serial_connection)
+    started = time.monotonic()
+    try:
+        response = transport.write_and_return(command, ack, timeout)
+    except asyncio.TimeoutError:
+        log.debug('No {} for {} in {} seconds'.format(
+            ack.encode(), command.encode(), timeout))
+        response = ''
+    writer = _recording['writer']
+    if writer:
+        writer.write(started, time.monotonic() - started, command, response)
     return response
 
 
+def start_recording(path):
+    '''Records the commands sent by `write_and_return`, their responses
+    and timing to a new `serial_log` at <path>, until `stop_recording`'''
+    stop_recording()
+    _recording['writer'] = serial_log.Writer(path)
+
+
+def stop_recording():
+    '''Stops recording, returns the number of commands recorded'''
+    writer, _recording['writer'] = _recording['writer'], None
+    if writer is None:
+        return 0
+    writer.close()
+    return writer.records
+
+
+@contextlib.contextmanager
+def recording(path):
+    '''Records serial traffic to <path> within the block'''
+    start_recording(path)
+    try:
+        yield
+    finally:
+        stop_recording()
+
+
 def connect(device_name=None, port=None, baudrate=115200):
     '''
     Creates a serial connection
     :param device_name: defaults to 'Smoothieboard'
+    :param port: port name, or 'replay:<path>' to replay a `serial_log`
     :param baudrate: integer frequency for serial communication
     :return: serial.Serial connection
     '''
+    if port and port.startswith(serial_log.REPLAY_PREFIX):
+        return serial_log.Replay(
+            port[len(serial_log.REPLAY_PREFIX):], replay_latency_scale)
     if not port:
         port = get_ports_by_name(device_name=device_name)[0]
     log.debug("Device name: {}, Port: {}".format(device_name, port))
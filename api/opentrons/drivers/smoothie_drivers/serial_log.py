@@ -0,0 +1,140 @@
+"""
+Recorded serial traffic, and its replay in place of a serial connection.
+
+`serial_communication.start_recording` writes every command sent through
+`write_and_return`, with the response it got and how long that took, to a
+log file. Connecting a driver to `replay:<log path>` (for instance
+`robot.connect('replay:bradford.otser')`) then feeds it the recorded
+responses, after the recorded latencies multiplied by
+`serial_communication.replay_latency_scale` (0 answers at once), so driver
+changes can be benchmarked without a robot.
+
+File layout (all integers little endian):
+
+    magic (8 bytes) | record*
+
+    record: start (float64) | duration (float64)
+            | command length (uint32) | response length (uint32)
+            | command (utf-8) | response (utf-8)
+
+where start is the seconds from the start of the recording to the command
+being sent and duration the seconds until its response was read.
+"""
+import asyncio
+import struct
+import threading
+import time
+from collections import namedtuple
+
+MAGIC = b'OTSER001'
+_RECORD = struct.Struct('<ddII')
+REPLAY_PREFIX = 'replay:'
+
+Record = namedtuple('Record', ['start', 'duration', 'command', 'response'])
+
+
+class ReplayMismatch(RuntimeError):
+    pass
+
+
+class Writer:
+    """
+    Appends records to a new log at <path>
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.records = 0
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+
+    def write(self, started: float, duration: float, command: str,
+              response: str) -> None:
+        """
+        Records <command> sent at <started> (a time.monotonic value) and its
+        <response>, read <duration> seconds later
+        """
+        command, response = command.encode(), response.encode()
+        with self._lock:
+            self._file.write(_RECORD.pack(
+                started - self._origin, duration,
+                len(command), len(response)))
+            self._file.write(command)
+            self._file.write(response)
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read(path: str) -> list:
+    """
+    Returns the records of the log at <path>
+    """
+    with open(path, 'rb') as log_f:
+        data = log_f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a serial log'.format(path))
+    records = []
+    offset = len(MAGIC)
+    while offset < len(data):
+        start, duration, command_len, response_len = \
+            _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        command = data[offset:offset + command_len].decode()
+        offset += command_len
+        response = data[offset:offset + response_len].decode()
+        offset += response_len
+        records.append(Record(start, duration, command, response))
+    return records
+
+
+class Replay:
+    """
+    Stands in for a serial connection and its transport, answering the
+    commands of a log in order with their recorded responses after their
+    recorded duration times <latency_scale>. Raises ReplayMismatch when a
+    command differs from the recorded one or the log is exhausted
+    """
+
+    def __init__(self, path: str, latency_scale: float=1.0) -> None:
+        self.port = REPLAY_PREFIX + path
+        self.latency_scale = latency_scale
+        self.timeout = None
+        self.is_open = True
+        self.records = read(path)
+        # Commands answered so far
+        self.commands = 0
+
+    def _next(self, command):
+        if self.commands >= len(self.records):
+            raise ReplayMismatch(
+                'Replay log exhausted, got {!r}'.format(command))
+        record = self.records[self.commands]
+        if record.command != command:
+            raise ReplayMismatch(
+                'Command {} of the replay log is {!r}, got {!r}'.format(
+                    self.commands, record.command, command))
+        self.commands += 1
+        return record
+
+    def write_and_return(self, command, ack, timeout=None):
+        record = self._next(command)
+        if self.latency_scale:
+            time.sleep(record.duration * self.latency_scale)
+        return record.response
+
+    async def send_command(self, command, ack, timeout=None):
+        record = self._next(command)
+        if self.latency_scale:
+            await asyncio.sleep(record.duration * self.latency_scale)
+        return record.response
+
+    def remaining(self) -> int:
+        return len(self.records) - self.commands
+
+    def close(self):
+        self.is_open = False
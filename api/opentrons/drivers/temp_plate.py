@@ -7,6 +7,8 @@ GCODES = {'SET_TEMP': 'M104 S{temp}',
           'GET_TEMP': 'M105'}
 
 BAUD_RATE = 9600
+COMMAND_TERMINATOR = '\r\n'
+ACK = 'ok\r\n'
 TEMP_THRESHOLD = 1
 SHUTDOWN_TEMP = 0
 
@@ -24,7 +26,7 @@ class TemperaturePlateDriver:
 
     def _send_command(self, command, timeout=None):
         ret_code = sc.write_and_return(
-            command, self._connection, timeout)
+            command + COMMAND_TERMINATOR, ACK, self._connection, timeout)
         return ret_code
 
     def connect(self, vid):
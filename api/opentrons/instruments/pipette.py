@@ -1316,6 +1316,7 @@ class Pipette:
         seconds = seconds % 60
         seconds += float(minutes * 60)
 
+        # Pausing waits for the moves streamed to the driver to finish
         self.robot.pause()
         _sleep(seconds)
         self.robot.resume()
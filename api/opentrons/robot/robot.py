@@ -1,5 +1,4 @@
 import os
-from functools import lru_cache
 
 import opentrons.util.calibration_functions as calib
 from numpy import add, subtract
@@ -792,13 +791,13 @@ class Robot(object):
             self._deck
         )
 
-        for slot in self._deck:
-            self.poses = pose_tracker.add(
-                self.poses,
-                slot,
-                self._deck,
-                pose_tracker.Point(*slot._coordinates)
-            )
+        slots = list(self._deck)
+        self.poses = pose_tracker.add_many(
+            self.poses,
+            slots,
+            self._deck,
+            [pose_tracker.Point(*slot._coordinates) for slot in slots]
+        )
 
         # @TODO (Laura & Andy) Slot and type of trash
         # needs to be pulled from config file
@@ -846,7 +845,6 @@ class Robot(object):
             if self._is_available_slot(location, share, slot, name):
                 location.add(container, label or name)
             self.add_container_to_pose_tracker(location, container)
-            self.max_deck_height.cache_clear()
         return container
 
     def add_module(self, module, slot, label=None):
@@ -871,21 +869,26 @@ class Robot(object):
             container.parent,
             pose_tracker.Point(*container._coordinates))
 
-        for well in container:
+        wells = list(container)
+        points = []
+        for well in wells:
             center_x, center_y, center_z = well.top()[1]
             offset_x, offset_y, offset_z = well._coordinates
             if not fflags.split_labware_definitions():
                 center_z = 0
-            self.poses = pose_tracker.add(
-                self.poses,
-                well,
-                container,
-                pose_tracker.Point(
-                    center_x + offset_x,
-                    center_y + offset_y,
-                    center_z + offset_z
-                )
-            )
+            points.append((
+                center_x + offset_x,
+                center_y + offset_y,
+                center_z + offset_z
+            ))
+
+        # Insert every well in one call rather than growing the tree well by
+        # well
+        self.poses = pose_tracker.add_many(
+            self.poses,
+            wells,
+            container,
+            points)
 
     @commands.publish.both(command=commands.pause)
     def pause(self):
@@ -1024,10 +1027,9 @@ class Robot(object):
             save
         )
 
-        self.max_deck_height.cache_clear()
-
-    @lru_cache()
     def max_deck_height(self):
+        # The pose tree keeps a max Z index that is updated along with
+        # labware poses, so this is cheap even while calibrating
         return pose_tracker.max_z(self.poses, self._deck)
 
     def max_placeable_height_on_deck(self, placeable):
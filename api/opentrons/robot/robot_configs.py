@@ -5,6 +5,7 @@
 from collections import namedtuple
 from opentrons.config import get_config_index, merge, children, build
 from opentrons.config import feature_flags as fflags
+from opentrons.config import persistence
 
 import json
 import os
@@ -147,10 +148,9 @@ def load(filename=None):
     result = _get_default()
 
     try:
-        with open(filename, 'r') as file:
-            local = json.load(file)
-            local = _check_version_and_update(local)
-            result = robot_config(**merge([result._asdict(), local]))
+        local = persistence.read_json(filename)
+        local = _check_version_and_update(local)
+        result = robot_config(**merge([result._asdict(), local]))
     except FileNotFoundError:
         log.warning('Config {0} not found. Loading defaults'.format(filename))
     except json.decoder.JSONDecodeError:
@@ -183,6 +183,7 @@ def backup_configuration(config, tag=None):
 def clear(filename=None):
     filename = filename or get_config_index().get('deckCalibrationFile')
     log.info('Deleting config file: {}'.format(filename))
+    persistence.discard(filename)
     if os.path.exists(filename):
         os.remove(filename)
 
@@ -193,10 +194,8 @@ def _save_config_json(config_json, filename=None, tag=None):
         root, ext = os.path.splitext(filename)
         filename = "{}-{}{}".format(root, tag, ext)
 
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, 'w') as file:
-        json.dump(config_json, file, sort_keys=True, indent=4)
-        return config_json
+    persistence.write_json(filename, config_json, sort_keys=True, indent=4)
+    return config_json
 
 
 def _check_version_and_update(config_json):
@@ -1,7 +1,6 @@
-import functools
-import itertools
-from collections import namedtuple, UserDict
-from typing import Dict, List
+from collections import namedtuple
+from collections.abc import Mapping
+from typing import List
 
 import numpy as np
 from numpy.linalg import inv
@@ -58,74 +57,416 @@ class Node(namedtuple('Node', 'parent children transform')):
             (transform1 == transform2).all()
 
 
+class PoseTree(Mapping):
+    """
+    Array-backed pose tree.
+
+    Parents, depths and 4x4 transforms are stored in preallocated NumPy
+    arrays addressed by a slot index, with an object -> slot map kept
+    alongside. Storage grows geometrically, so insertion is O(1) amortized
+    and a whole container's wells can be inserted with a single call to
+    :meth:`add_many`.
+
+    The tree is a read-only :class:`Mapping` of object -> :class:`Node` so
+    existing code inspecting ``state[obj]`` keeps working, but mutations
+    happen in place: the functional API (:func:`add`, :func:`update`,
+    :func:`remove`) mutates the tree it is given and returns it.
+
+    Every node also caches its transform composed all the way to the root
+    (both the ascending and the descending products, and their inverses).
+    The cache is filled lazily; :meth:`update` only marks the moved node's
+    subtree as dirty, so positions of static labware are a cache hit.
+
+    Finally, each node maintains the highest Z of its descendants in its
+    own coordinate system, so :func:`max_z` (e.g. arc heights over the deck
+    or a container) is answered from the index. Changes only mark the
+    node's ancestors stale and recomputing one level reuses the children's
+    values.
+    """
+    def __init__(self, capacity=64):
+        self._index = {}
+        self._objects = []
+        self._children = []
+        self._free = []
+        self._parents = np.full(capacity, -1, dtype=np.intp)
+        self._depths = np.zeros(capacity, dtype=np.intp)
+        self._transforms = np.zeros((capacity, 4, 4))
+        # Cached products of transforms from a node to the root. "up" is
+        # T(node) . T(parent) ... and "down" is ... T(parent) . T(node), which
+        # matches the order change_base folds the two sides of a path in
+        self._dirty = np.ones(capacity, dtype=bool)
+        self._up = np.zeros((capacity, 4, 4))
+        self._up_inv = np.zeros((capacity, 4, 4))
+        self._down = np.zeros((capacity, 4, 4))
+        self._down_inv = np.zeros((capacity, 4, 4))
+        # Highest Z of each node's descendants, in the node's own frame
+        self._top = np.full(capacity, -np.inf)
+        self._top_dirty = np.zeros(capacity, dtype=bool)
+
+    def __getitem__(self, obj) -> Node:
+        slot = self._index[obj]
+        parent = self._parents[slot]
+        return Node(
+            parent=None if parent < 0 else self._objects[parent],
+            children=[self._objects[child] for child in self._children[slot]],
+            transform=self._transforms[slot].copy())
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, obj):
+        return obj in self._index
+
+    def __repr__(self):
+        return '<{} of {} nodes>'.format(self.__class__.__name__, len(self))
+
+    def copy(self):
+        res = PoseTree(capacity=len(self._parents))
+        res._index = self._index.copy()
+        res._objects = self._objects.copy()
+        res._children = [children.copy() for children in self._children]
+        res._free = self._free.copy()
+        res._parents = self._parents.copy()
+        res._depths = self._depths.copy()
+        res._transforms = self._transforms.copy()
+        res._dirty = self._dirty.copy()
+        res._up = self._up.copy()
+        res._up_inv = self._up_inv.copy()
+        res._down = self._down.copy()
+        res._down_inv = self._down_inv.copy()
+        res._top = self._top.copy()
+        res._top_dirty = self._top_dirty.copy()
+        return res
+
+    def _reserve(self, count):
+        """ Make sure there are at least :count: unused slots """
+        needed = len(self._objects) + max(0, count - len(self._free))
+        capacity = len(self._parents)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grow = capacity - len(self._parents)
+        self._parents = np.concatenate(
+            (self._parents, np.full(grow, -1, dtype=np.intp)))
+        self._depths = np.concatenate(
+            (self._depths, np.zeros(grow, dtype=np.intp)))
+        self._transforms = np.concatenate(
+            (self._transforms, np.zeros((grow, 4, 4))))
+        self._dirty = np.concatenate((self._dirty, np.ones(grow, dtype=bool)))
+        for name in ('_up', '_up_inv', '_down', '_down_inv'):
+            setattr(self, name, np.concatenate(
+                (getattr(self, name), np.zeros((grow, 4, 4)))))
+        self._top = np.concatenate((self._top, np.full(grow, -np.inf)))
+        self._top_dirty = np.concatenate(
+            (self._top_dirty, np.zeros(grow, dtype=bool)))
+
+    def _allocate(self, obj):
+        if self._free:
+            slot = self._free.pop()
+            self._objects[slot] = obj
+            self._children[slot] = []
+        else:
+            slot = len(self._objects)
+            self._objects.append(obj)
+            self._children.append([])
+        self._index[obj] = slot
+        return slot
+
+    def add(self, obj, parent=ROOT, point=Point(0, 0, 0),
+            transform=np.identity(4)):
+        return self.add_many([obj], parent, [point], transform)
+
+    def add_many(self, objects, parent=ROOT, points=None,
+                 transform=np.identity(4)):
+        """
+        Add :objects: as children of :parent: in one call. :points: is a
+        sequence (or N x 3 array) of positions within the parent, one per
+        object. The same :transform: is applied to every object.
+        """
+        objects = list(objects)
+        if points is None:
+            points = np.zeros((len(objects), 3))
+        points = np.asarray(points, dtype=float).reshape(len(objects), 3)
+        transform = np.asarray(transform, dtype=float)
+
+        if parent is None:
+            parent_slot, depth = -1, 0
+        else:
+            parent_slot = self._index[parent]
+            depth = self._depths[parent_slot] + 1
+
+        assert len(set(objects)) == len(objects), \
+            'object is already being tracked'
+        for obj in objects:
+            assert obj not in self._index, 'object is already being tracked'
+
+        self._reserve(len(objects))
+        slots = [self._allocate(obj) for obj in objects]
+
+        self._parents[slots] = parent_slot
+        self._depths[slots] = depth
+        self._transforms[slots] = np.matmul(transform, translate_many(-points))
+        self._dirty[slots] = True
+        self._top[slots] = -np.inf
+        self._top_dirty[slots] = False
+        if parent_slot >= 0:
+            self._children[parent_slot].extend(slots)
+            self._invalidate_top(parent_slot)
+        return self
+
+    def update(self, obj, point, transform=np.identity(4)):
+        slot = self._index[obj]
+        self._transforms[slot] = transform.dot(translate(-np.asarray(point)))
+        self._invalidate(slot)
+        self._invalidate_top(self._parents[slot])
+        return self
+
+    def _invalidate(self, slot):
+        """ Mark cached transforms of :slot: and its subtree as stale """
+        # A dirty node always has a dirty subtree, so there is nothing to do
+        # if it is already marked
+        if self._dirty[slot]:
+            return
+        stack = [slot]
+        while stack:
+            slot = stack.pop()
+            self._dirty[slot] = True
+            stack.extend(
+                child for child in self._children[slot]
+                if not self._dirty[child])
+
+    def _refresh(self, slot):
+        """ Recompute cached transforms of :slot: and its stale ancestors """
+        stale = []
+        while slot >= 0 and self._dirty[slot]:
+            stale.append(slot)
+            slot = self._parents[slot]
+
+        for slot in reversed(stale):
+            parent = self._parents[slot]
+            if parent < 0:
+                # Transform of the root is not part of any path
+                up = down = np.identity(4)
+            else:
+                up = self._transforms[slot].dot(self._up[parent])
+                down = self._down[parent].dot(self._transforms[slot])
+            self._up[slot] = up
+            self._up_inv[slot] = inv(up)
+            self._down[slot] = down
+            self._down_inv[slot] = inv(down)
+            self._dirty[slot] = False
+
+    def _invalidate_top(self, slot):
+        """ Mark max Z of :slot: and its ancestors as stale """
+        # A stale node always has stale ancestors, so stop at the first one
+        while slot >= 0 and not self._top_dirty[slot]:
+            self._top_dirty[slot] = True
+            slot = self._parents[slot]
+
+    def _max_z(self, slot):
+        """ Highest Z of descendants in :slot:'s coordinate system """
+        if not self._top_dirty[slot]:
+            return self._top[slot]
+
+        # Stale nodes always have stale ancestors, so there is no need to look
+        # below an up to date one
+        dirty = self._top_dirty
+        stale = [slot] + [
+            node
+            for node, _ in self._walk(slot, prune=lambda node: not dirty[node])
+            if dirty[node]]
+
+        # Children are recomputed before their parents
+        for node in reversed(stale):
+            self._top[node] = self._children_max_z(node)
+            self._top_dirty[node] = False
+        return self._top[slot]
+
+    def _children_max_z(self, slot):
+        children = np.array(self._children[slot], dtype=np.intp)
+        if not len(children):
+            return -np.inf
+
+        # A child whose transform keeps the Z axis (translations, rotations
+        # around Z) contributes its own offset plus its subtree's max Z
+        transforms = self._transforms[children]
+        keeps_z = \
+            np.all(transforms[:, 2, :3] == (0, 0, 1), axis=1) & \
+            np.all(transforms[:, 3] == (0, 0, 0, 1), axis=1)
+        tops = np.maximum(self._top[children], 0) - transforms[:, 2, 3]
+
+        # Anything else has its subtree transformed explicitly
+        for i in np.flatnonzero(~keeps_z):
+            child = self._objects[children[i]]
+            subtree = [child] + [
+                obj for obj, _ in iter_descendants(self, child)]
+            tops[i] = change_base_many(
+                self, src=subtree, dst=self._objects[slot])[:, 2].max()
+        return tops.max()
+
+    def _common_ancestor(self, first, second):
+        depths, parents = self._depths, self._parents
+        while depths[first] > depths[second]:
+            first = parents[first]
+        while depths[second] > depths[first]:
+            second = parents[second]
+        while first != second:
+            first, second = parents[first], parents[second]
+        return first
+
+    def remove(self, obj):
+        slot = self._index[obj]
+        parent = self._parents[slot]
+        if parent >= 0:
+            self._children[parent].remove(slot)
+            self._invalidate_top(parent)
+
+        subtree = [slot] + [node for node, _ in self._walk(slot)]
+        for slot in subtree:
+            del self._index[self._objects[slot]]
+            self._objects[slot] = None
+            self._children[slot] = []
+            self._parents[slot] = -1
+            self._free.append(slot)
+        return self
+
+    def _walk(self, slot, level=0, max_depth=None, prune=None):
+        """
+        Yield (slot, depth) for descendants of :slot: in DFS order, using an
+        explicit stack instead of recursion
+        """
+        children = self._children
+        stack = [(child, level) for child in reversed(children[slot])]
+        while stack:
+            slot, depth = stack.pop()
+            yield slot, depth
+            if max_depth is not None and depth - level + 1 >= max_depth:
+                continue
+            if prune is not None and prune(slot):
+                continue
+            stack.extend(
+                (child, depth + 1) for child in reversed(children[slot]))
+
+    def _ascend(self, slot):
+        """ Yield slots from :slot: up to and including the root """
+        while slot >= 0:
+            yield slot
+            slot = self._parents[slot]
+
+
+def translate_many(points) -> np.ndarray:
+    """ Stack of translation matrices, one per row of an N x 3 array """
+    points = np.asarray(points, dtype=float)
+    res = np.tile(np.identity(4), (len(points), 1, 1))
+    res[:, :3, 3] = points
+    return res
+
+
+def _tree(state) -> PoseTree:
+    if isinstance(state, PoseTree):
+        return state
+    # Build an array-backed tree from a plain {obj: Node} mapping
+    tree = PoseTree(capacity=max(len(state), 1) * 2)
+    pending = [obj for obj, node in state.items() if node.parent is None]
+    while pending:
+        obj = pending.pop(0)
+        node = state[obj]
+        tree.add_many([obj], node.parent, None, node.transform)
+        pending.extend(node.children)
+    return tree
+
+
 def init():
-    return add({}, ROOT, parent=None)
+    return PoseTree().add(ROOT, parent=None)
 
 
 def add(
-        state: Dict[object, Node],
+        state: PoseTree,
         obj,
         parent=ROOT,
         point=Point(0, 0, 0),
-        transform=np.identity(4)) -> Dict[object, Node]:
+        transform=np.identity(4)) -> PoseTree:
 
     if isinstance(transform, list):
         transform = np.array(transform)
 
-    state = bind(state)
-
-    if parent is not None:
-        state[parent] = state[parent].add(obj)
+    return _tree(state).add(obj, parent, point, transform)
 
-    assert obj not in state, 'object is already being tracked'
 
-    state[obj] = Node(
-        parent=parent,
-        children=[],
-        transform=transform.dot(inv(translate(point)))
-    )
+def add_many(
+        state: PoseTree,
+        objects,
+        parent=ROOT,
+        points=None,
+        transform=np.identity(4)) -> PoseTree:
+    """
+    Add several children of :parent: at once, e.g. every well of a container
+    """
+    if isinstance(transform, list):
+        transform = np.array(transform)
 
-    return state
+    return _tree(state).add_many(objects, parent, points, transform)
 
 
 def remove(state, obj):
-    state = state.copy()
-    nodes = descendants(state, obj) + [(obj, 0)]
-
-    # remove object references from their parent's children
-    for child, *_ in nodes:
-        parent = state[child].parent
-        if parent in state:
-            state[parent] = state[parent].remove(child)
-        del state[child]
-    return state
+    return _tree(state).remove(obj)
 
 
 def update(state, obj, point: Point, transform=np.identity(4)):
-    state = state.copy()
-    state[obj] = state[obj].update(
-        transform.dot(inv(translate(point)))
-    )
-    return state
+    return _tree(state).update(obj, point, transform)
+
+
+def iter_descendants(state, obj, level=0, max_depth=None, prune=None):
+    """
+    Lazily yields (descendant, depth) tuples of DFS traversal of subtree
+    from object, without recursion.
+
+    :max_depth: limits how many levels below :obj: are visited and
+    :prune: is a predicate; children of objects it returns True for are
+    skipped
+    """
+    state = _tree(state)
+    objects = state._objects
+    if prune is not None:
+        def slot_prune(slot):
+            return prune(objects[slot])
+    else:
+        slot_prune = None
+
+    for slot, depth in state._walk(
+            state._index[obj], level, max_depth, slot_prune):
+        yield objects[slot], depth
 
 
 def descendants(state, obj, level=0):
     """ Returns a flattened list tuples of DFS traversal of subtree
     from object that contains descendant object and it's depth """
-    return sum([
-        [(child, level)] + descendants(state, child, level + 1)
-        for child in state[obj].children
-    ], [])
+    return list(iter_descendants(state, obj, level))
 
 
 def has_children(state, obj):
-    return True if len(descendants(state, obj)) > 0 else False
+    return next(iter_descendants(state, obj, max_depth=1), None) is not None
+
+
+def iter_ascend(state, start, finish=ROOT):
+    """
+    Lazily yields objects from :start: up to and including :finish:
+    """
+    state = _tree(state)
+    for slot in state._ascend(state._index[start]):
+        obj = state._objects[slot]
+        yield obj
+        if obj is finish:
+            return
+    raise KeyError(finish)
 
 
 def ascend(state, start, finish=ROOT) -> List[Node]:
-    if start is finish:
-        return [finish]
-    return [start] + ascend(state, start=state[start].parent, finish=finish)
+    return list(iter_ascend(state, start, finish))
 
 
 def change_base(state, point=Point(0, 0, 0), src=ROOT, dst=ROOT):
@@ -133,29 +474,69 @@ def change_base(state, point=Point(0, 0, 0), src=ROOT, dst=ROOT):
     Transforms point from source coordinate system to destination.
     Point(0, 0, 0) means the origin of the source.
     """
-    def fold(objects):
-        return functools.reduce(
-            lambda a, b: a.dot(b),
-            [state[key].transform for key in objects],
-            np.identity(4)
-        )
+    state = _tree(state)
+    src, dst = state._index[src], state._index[dst]
+    state._refresh(src)
+    state._refresh(dst)
 
-    up, down = ascend(state, src), list(reversed(ascend(state, dst)))
+    # Point in root's coordinate system
+    point_in_root = state._up_inv[src].dot((*point, 1))
+    to_dst = state._down[dst]
 
-    # Find common prefix. Last item is common root
-    root = [n1 for n1, n2 in zip(reversed(up), down) if n1 is n2].pop()
+    # Cached products run all the way to the root, so cancel out the part
+    # above the common ancestor (the root itself contributes nothing)
+    common = state._common_ancestor(src, dst)
+    if common >= 0 and state._depths[common] > 0:
+        point_in_root = state._up[common].dot(point_in_root)
+        to_dst = state._down_inv[common].dot(to_dst)
 
-    # Nodes up to root, EXCLUDING root
-    up = list(itertools.takewhile(lambda node: node is not root, up))
+    # Return point in destination's coordinate system
+    return to_dst.dot(point_in_root)[:-1]
 
-    # Nodes down from root, EXCLUDING root
-    down = list(itertools.dropwhile(lambda node: node is not root, down))[1:]
 
-    # Point in root's coordinate system
-    point_in_root = inv(fold(up)).dot((*point, 1))
+def change_base_many(state, points=None, src=ROOT, dst=ROOT) -> np.ndarray:
+    """
+    Vectorized :func:`change_base`, returning an N x 3 array.
 
-    # Return point in destination's coordinate system
-    return fold(down).dot(point_in_root)[:-1]
+    :src: is either a single object, with :points: an N x 3 array of points
+    in its coordinate system, or a list of N objects, with :points: holding
+    one point per object. Omitted :points: are the origin of each source (a
+    1 x 3 array for a single object). Sources sharing a common ancestor with
+    :dst: are transformed together in one matrix multiply.
+    """
+    state = _tree(state)
+    if points is not None:
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if isinstance(src, (list, tuple)):
+        slots = np.array([state._index[obj] for obj in src], dtype=np.intp)
+    else:
+        slots = np.full(
+            1 if points is None else len(points),
+            state._index[src], dtype=np.intp)
+
+    homogeneous = np.zeros((len(slots), 4))
+    homogeneous[:, 3] = 1
+    if points is not None:
+        homogeneous[:, :3] = points
+
+    dst = state._index[dst]
+    state._refresh(dst)
+    groups = {}
+    for i, slot in enumerate(slots):
+        state._refresh(slot)
+        common = state._common_ancestor(slot, dst)
+        groups.setdefault(common, []).append(i)
+
+    res = np.empty((len(slots), 3))
+    for common, rows in groups.items():
+        to_dst = state._down[dst]
+        if common >= 0 and state._depths[common] > 0:
+            to_dst = state._down_inv[common].dot(to_dst).dot(
+                state._up[common])
+        in_root = np.einsum(
+            'nij,nj->ni', state._up_inv[slots[rows]], homogeneous[rows])
+        res[rows] = in_root.dot(to_dst.T)[:, :3]
+    return res
 
 
 def absolute(state, obj):
@@ -165,35 +546,40 @@ def absolute(state, obj):
     return change_base(state, src=obj)
 
 
-def max_z(state, root):
-    test = [
-        (obj, Point(*change_base(state, src=obj, dst=root)).z)
-        for obj, _ in descendants(state, root)
-    ]
+def absolute_many(state, objects) -> np.ndarray:
+    """
+    Get the (x, y, z) positions of several objects as an N x 3 array
+    """
+    return change_base_many(state, src=list(objects))
 
-    # from pprint import pprint
-    # pprint(test, indent=2)
-    m = max([i[1] for i in test])
-    return m
+
+def max_z(state, root):
+    """
+    Highest Z of any descendant of :root:, in :root:'s coordinate system.
+    Raises ValueError if :root: has no descendants
+    """
+    state = _tree(state)
+    slot = state._index[root]
+    if not state._children[slot]:
+        raise ValueError('{} has no descendants'.format(root))
+    return state._max_z(slot)
 
 
 def stringify(state, root=None):
     if root is None:
         root = ascend(state, next(iter(state)))[-1]
 
-    info = [
-        (obj, level, change_base(state, src=obj, dst=root))
-        for obj, level in [(root, 0)] + descendants(state, root, level=1)]
+    nodes = [(root, 0), *iter_descendants(state, root, level=1)]
+    worlds = change_base_many(
+        state, src=[obj for obj, _ in nodes], dst=root)
 
     return '\n'.join([
         ' ' * level + '{} {}'.format(str(obj), world)
-        for obj, level, world in info
+        for (obj, level), world in zip(nodes, worlds)
     ])
 
 
 def bind(state):
-    state = UserDict(state.copy())
-    # add syntax sugar for chaining add operations
-    state.add = functools.partial(add, state)
-
-    return state
+    # PoseTree.add already returns the tree, which allows chaining add
+    # operations
+    return _tree(state)
@@ -56,6 +56,9 @@ def refresh():
         'CONTAINERS_FILE':
             os.path.join(
                 APP_DATA_DIR, 'containers', '_containers_create.json'),
+        'CONTAINERS_JOURNAL_FILE':
+            os.path.join(
+                APP_DATA_DIR, 'containers', '_containers_create.jsonl'),
         'CALIBRATIONS_DIR': os.path.join(APP_DATA_DIR, 'calibrations'),
         'CALIBRATIONS_FILE':
             os.path.join(APP_DATA_DIR, 'calibrations', 'calibrations.json'),
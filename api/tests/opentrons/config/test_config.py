@@ -1,3 +1,5 @@
+import json
+
 from opentrons.config import merge, children, build
 
 
@@ -68,3 +70,22 @@ def test_children():
             'i': None
         }
     }
+
+
+def test_config_index_follows_settings_dir(tmpdir, monkeypatch):
+    from opentrons import config
+
+    index = config.get_config_index()
+    reads = config.read_counts['index']
+    # Callers get their own copy
+    config.get_config_index()['labware']['offsetDir'] = 'changed'
+    assert config.get_config_index()['labware']['offsetDir'] != 'changed'
+    assert config.read_counts['index'] == reads
+
+    other = tmpdir.mkdir('settings')
+    other.join(config.index_filename).write(json.dumps({'other': True}))
+    monkeypatch.setattr(config, 'override_settings_dir', str(other))
+    assert config.get_config_index() == {'other': True}
+    monkeypatch.undo()
+    assert config.get_config_index() == index
+    assert config.read_counts['index'] == reads + 2
@@ -0,0 +1,54 @@
+import json
+import os
+
+from opentrons.config import get_config_index
+from opentrons.config import feature_flags as ff
+
+
+def test_flags_are_cached():
+    ff.set_feature_flag('split-labware-def', True)
+    reads = ff.disk_reads()
+
+    for _ in range(100):
+        assert ff.split_labware_definitions()
+        get_config_index()
+
+    assert ff.disk_reads() == reads
+
+
+def test_flags_read_without_copying_index(monkeypatch):
+    from opentrons import config
+    ff.set_feature_flag('split-labware-def', True)
+    ff_file = get_config_index().get('featureFlagFile')
+
+    def deepcopy(value):
+        raise AssertionError('index copied')
+
+    monkeypatch.setattr(config.copy, 'deepcopy', deepcopy)
+    assert config.feature_flag_file() == ff_file
+    assert ff.split_labware_definitions()
+
+
+def test_set_feature_flag_updates_cache():
+    ff.set_feature_flag('dots-deck-type', True)
+    assert ff.dots_deck_type()
+    ff.set_feature_flag('dots-deck-type', False)
+    assert not ff.dots_deck_type()
+    assert ff.get_all_feature_flags() == {'dots-deck-type': False}
+
+
+def test_external_changes_invalidate_cache():
+    ff_file = get_config_index().get('featureFlagFile')
+    ff.set_feature_flag('short-fixed-trash', True)
+    assert ff.short_fixed_trash()
+
+    reads = ff.disk_reads()['featureFlags']
+    with open(ff_file, 'w') as fd:
+        json.dump({'short-fixed-trash': False, 'calibrate-to-bottom': 1}, fd)
+    assert not ff.short_fixed_trash()
+    assert ff.calibrate_to_bottom()
+    assert ff.disk_reads()['featureFlags'] == reads + 1
+
+    os.remove(ff_file)
+    assert not ff.calibrate_to_bottom()
+    assert ff.get_all_feature_flags() == {}
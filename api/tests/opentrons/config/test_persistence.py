@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+import pytest
+
+from opentrons.config import persistence
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    persistence.flush()
+    monkeypatch.setattr(persistence, 'delay', 60)
+    monkeypatch.setattr(persistence, 'stats', {
+        'files_written': 0, 'bytes_written': 0, 'coalesced': 0})
+    yield persistence
+    persistence.flush()
+
+
+def test_writes_coalesced_until_flush(writer, tmpdir):
+    path = str(tmpdir.join('offsets', 'plate.json'))
+    for z in range(10):
+        writer.write_json(path, {'x': 0, 'y': 0, 'z': z}, indent=2)
+
+    assert not os.path.exists(path)
+    assert writer.read_json(path) == {'x': 0, 'y': 0, 'z': 9}
+    assert writer.stats['coalesced'] == 9
+
+    writer.flush()
+    with open(path) as f:
+        contents = f.read()
+    assert json.loads(contents) == {'x': 0, 'y': 0, 'z': 9}
+    assert writer.stats['files_written'] == 1
+    assert writer.stats['bytes_written'] == len(contents.encode('utf-8'))
+    assert os.listdir(os.path.dirname(path)) == ['plate.json']
+
+
+def test_flush_after_delay(writer, tmpdir, monkeypatch):
+    monkeypatch.setattr(persistence, 'delay', 0.05)
+    path = str(tmpdir.join('config.json'))
+    writer.write_json(path, {'a': 1})
+    data = {'a': 2}
+    writer.write_json(path, data)
+    data['a'] = 3
+
+    deadline = time.time() + 5
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    with open(path) as f:
+        assert json.load(f) == {'a': 2}
+
+
+@pytest.mark.parametrize('policy', persistence.FSYNC_POLICIES)
+def test_fsync_policy(writer, tmpdir, monkeypatch, policy):
+    synced = []
+    monkeypatch.setattr(os, 'fsync', synced.append)
+    monkeypatch.setattr(persistence, 'delay', 0)
+    monkeypatch.setattr(persistence, 'fsync', policy)
+    writer.write_json(str(tmpdir.join('config.json')), {})
+    assert len(synced) == {'never': 0, 'file': 1, 'always': 2}[policy]
+
+    monkeypatch.setattr(persistence, 'fsync', 'sometimes')
+    with pytest.raises(ValueError):
+        writer.write_json(str(tmpdir.join('config.json')), {})
+
+
+def test_discard(writer, tmpdir):
+    path = str(tmpdir.join('config.json'))
+    writer.write_json(path, {'a': 1})
+    writer.discard(path)
+    writer.flush()
+    assert not os.path.exists(path)
+    with pytest.raises(FileNotFoundError):
+        writer.read_json(path)
+
+
+def test_labware_offset_and_robot_config(writer, tmpdir, monkeypatch):
+    from opentrons.data_storage import labware_definitions as ldef
+    from opentrons.robot import robot_configs
+
+    monkeypatch.setattr(
+        ldef, 'offset_dir', lambda: str(tmpdir.join('offsets')))
+    for z in range(5):
+        ldef.save_labware_offset('plate', {'x': 1, 'y': 2, 'z': z})
+    assert ldef._load_offset(ldef.offset_dir(), 'plate') == \
+        {'x': 1, 'y': 2, 'z': 4}
+
+    filename = str(tmpdir.join('deck_calibration.json'))
+    config = robot_configs._get_default()
+    robot_configs.save(config._replace(name='coalesced'), filename)
+    robot_configs.save(config._replace(name='saved'), filename)
+    assert writer.stats['files_written'] == 0
+    assert writer.stats['coalesced'] == 5
+
+    writer.flush()
+    assert writer.stats['files_written'] == 2
+    assert robot_configs.load(filename).name == 'saved'
@@ -7,6 +7,7 @@ import os
 import re
 import shutil
 import json
+import tempfile
 from collections import namedtuple
 from functools import partial
 from uuid import uuid4 as uuid
@@ -17,6 +18,7 @@ from opentrons.data_storage import database
 from opentrons.server import rpc
 from opentrons import config
 from opentrons.config import feature_flags as ff
+from opentrons.config import persistence
 from opentrons.server.main import init
 from opentrons.deck_calibration import endpoints
 
@@ -59,10 +61,14 @@ Protocol = namedtuple(
 
 # Note: When dummy_db or robot fixtures are used, this db is copied into a
 # a temp testing_db that is deleted in between tests to allow for db mutation
-MAIN_TESTER_DB = str(os.path.join(
+CHECKED_IN_DB = str(os.path.join(
     os.path.dirname(
         globals()["__file__"]), 'testing_database.db')
 )
+# The other tests use a copy made for the session, so that the checked in
+# file is never modified (connections switch it to WAL, rewriting its header)
+MAIN_TESTER_DB = os.path.join(tempfile.mkdtemp(), 'testing_database.db')
+shutil.copy2(CHECKED_IN_DB, MAIN_TESTER_DB)
 
 
 def state(topic, state):
@@ -139,11 +145,37 @@ def labware_test_data():
     shutil.rmtree(deck_calibration_dir, ignore_errors=True)
 
 
+@pytest.fixture(autouse=True)
+def flush_pending_writes(labware_test_data):
+    """
+    Writes files a test saved through persistence before its data is
+    removed, so they do not shadow the next test's files
+    """
+    yield
+    persistence.flush()
+
+
+@pytest.fixture
+def write_immediately(monkeypatch):
+    """
+    Saves through persistence without a delay, for tests that read the
+    saved files back from disk
+    """
+    monkeypatch.setattr(persistence, 'delay', 0)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def main_tester_db():
+    yield
+    database.close_connections()
+    shutil.rmtree(os.path.dirname(MAIN_TESTER_DB), ignore_errors=True)
+
+
 # Builds a temp db to allow mutations during testing
 @pytest.fixture
 def dummy_db(tmpdir):
     temp_db_path = str(tmpdir.mkdir('testing').join("database.db"))
-    shutil.copy2(MAIN_TESTER_DB, temp_db_path)
+    shutil.copy2(CHECKED_IN_DB, temp_db_path)
     database.change_database(temp_db_path)
     yield None
     database.change_database(MAIN_TESTER_DB)
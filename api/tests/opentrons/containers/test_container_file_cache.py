@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import json
+import os
+import shutil
+
+import pytest
+
+from opentrons.config import feature_flags as ff
+from opentrons.data_storage import old_container_loading
+from opentrons.util import environment
+
+pytestmark = pytest.mark.skipif(
+    ff.split_labware_definitions(),
+    reason='json container files are not loaded with split definitions')
+
+
+@pytest.fixture
+def containers_dir(tmpdir, monkeypatch):
+    monkeypatch.setenv('APP_DATA_DIR', str(tmpdir))
+    environment.refresh()
+    path = environment.get_path('CONTAINERS_DIR')
+    shutil.rmtree(path)
+    shutil.copytree(os.path.join(os.path.dirname(__file__), 'data'), path)
+    old_container_loading.persisted_containers_dict.clear()
+    yield path
+    monkeypatch.undo()
+    environment.refresh()
+    old_container_loading.persisted_containers_dict.clear()
+
+
+def test_reload_only_parses_changed_files(containers_dir):
+    old_container_loading.load_all_containers_from_disk()
+    parsed = dict(old_container_loading._parsed_files)
+    assert old_container_loading.default_containers_path in parsed
+
+    changed = os.path.join(containers_dir, 'containers-1.json')
+    with open(changed) as f:
+        data = json.load(f, object_pairs_hook=OrderedDict)
+    data['containers']['container-1']['origin-offset'] = {'x': 1}
+    with open(changed, 'w') as f:
+        json.dump(data, f)
+
+    old_container_loading.load_all_containers_from_disk()
+    for path, (stamp, contents) in \
+            old_container_loading._parsed_files.items():
+        if path == changed:
+            assert contents is not parsed[path][1]
+        elif path in parsed:
+            assert contents is parsed[path][1]
+    plate = old_container_loading.get_persisted_container('container-1')
+    assert plate._coordinates[0] == 1
+
+
+def test_save_custom_container(containers_dir):
+    from opentrons.containers import save_custom_container
+
+    container_file = environment.get_path('CONTAINERS_FILE')
+    journal_file = environment.get_path('CONTAINERS_JOURNAL_FILE')
+    first = {'locations': {'A1': {
+        'x': 0, 'y': 0, 'z': 0, 'depth': 10, 'diameter': 5}}}
+    second = {'locations': {'A1': {
+        'x': 0, 'y': 0, 'z': 0, 'depth': 20, 'diameter': 5}}}
+    with open(container_file, 'w') as f:
+        json.dump({'containers': {'saved-old': first}}, f)
+    old_container_loading.load_all_containers_from_disk()
+    stamp = os.stat(container_file).st_mtime_ns
+
+    save_custom_container({'saved-plate': first})
+    save_custom_container({'saved-other': first})
+    # Saves are appended, the containers file is not rewritten
+    assert os.stat(container_file).st_mtime_ns == stamp
+    with open(journal_file) as f:
+        assert len(f.readlines()) == 2
+    assert list(old_container_loading._read_journal(journal_file)) == [
+        'saved-plate', 'saved-other']
+
+    # A record cut short is skipped, later records are still read
+    with open(journal_file, 'a') as f:
+        f.write('["saved-broken", {')
+    save_custom_container({'saved-plate': second})
+    journal = old_container_loading._journals[journal_file]
+    offset = journal['offset']
+    assert old_container_loading._read_journal(journal_file) == {
+        'saved-plate': second, 'saved-other': first}
+    assert journal['offset'] > offset
+
+    # Compacted into the existing file, in its existing format
+    old_container_loading.load_all_containers_from_disk()
+    assert not os.path.exists(journal_file)
+    with open(container_file) as f:
+        assert json.load(f) == {'containers': {
+            'saved-old': first, 'saved-plate': second, 'saved-other': first}}
+    cached = old_container_loading._parsed_files[container_file][1]
+    assert old_container_loading._read_file(container_file) is cached
+
+    plate = old_container_loading.get_persisted_container('saved-plate')
+    assert plate[0].z_size() == 20
+    assert 'saved-other' in old_container_loading.list_container_names()
+    assert 'saved-old' in old_container_loading.list_container_names()
@@ -1,6 +1,6 @@
 import unittest
 
-from opentrons.containers import load
+from opentrons.containers import load, placeable
 from opentrons.instruments import pipette
 from opentrons import Robot
 
@@ -30,6 +30,38 @@ class GridTestCase(unittest.TestCase):
         for well, next_well in zip(wells[:-1], wells[1:]):
             self.assertEqual(well, next_well)
 
+    def test_grid_layout_shared(self):
+        plate = self.plate
+        other = load(self.robot, '96-flat', '5')
+
+        self.assertIs(plate.rows, plate.rows)
+        self.assertIs(plate.cols['3'], plate.cols[2])
+        self.assertIs(plate._grid_layout(), other._grid_layout())
+        self.assertIsNot(plate.rows['A'][0], other.rows['A'][0])
+        self.assertIs(other.rows['C']['7'], other['C7'])
+
+        # Rows index into the plate's well table rather than copying it
+        row = plate.rows['B']
+        self.assertNotIsInstance(row.values, list)
+        self.assertNotIsInstance(row.items, dict)
+        self.assertEqual(row.get_name_by_instance(plate['B3']), '3')
+        self.assertEqual(list(row.wells('2', length=3)),
+                         [plate['B2'], plate['B3'], plate['B4']])
+        self.assertEqual(list(plate.cols[0][2:4]), [plate['C1'], plate['D1']])
+
+        # Layouts are cached per labware type, up to a bound
+        cache = placeable._grid_layout_for.cache_info()
+        self.assertEqual(cache.maxsize, placeable.GRID_LAYOUT_CACHE_SIZE)
+        self.assertLessEqual(cache.currsize, cache.maxsize)
+
+        expected = plate.get_wellseries(plate.transpose(plate.get_grid()))
+        self.assertEqual(
+            [list(row) for row in plate.rows],
+            [list(row) for row in expected])
+        self.assertEqual(
+            [row.get_name() for row in plate.rows],
+            [row.get_name() for row in expected])
+
     # TODO(artyom 20171031): uncomment once container storage and stabilized
     # def test_placeable(self):
     #     plate = self.plate
@@ -284,3 +284,49 @@ class PlaceableTestCase(unittest.TestCase):
         self.assertWellSeriesEqual(c.rows(3), c.wells(y=3))
         self.assertWellSeriesEqual(c.cols(4), c.wells(x=4))
         self.assertRaises(ValueError, c.wells, **{'x': '1', 'y': '2'})
+
+
+def test_split_labware_ordering_table(split_labware_def):
+    c = generate_plate(4, 2, (5, 5), (0, 0), 5)
+    assert [well.get_name() for well in c] == ['A1', 'B1', 'A2', 'B2']
+    assert len(c) == 4
+    assert c[2] is c['A2']
+    assert c[-1] is c['B2']
+    assert list(c[1:3]) == [c['B1'], c['A2']]
+
+    # Table is rebuilt when the ordering or the wells change
+    c.ordering = [['B2', 'A2'], ['B1', 'A1']]
+    assert c[0] is c['B2']
+
+    well = Well(properties={'radius': 5, 'height': 0})
+    c.add(well, 'C1', (10, 0, 0))
+    c.ordering = [['A1', 'B1', 'C1'], ['A2', 'B2']]
+    assert c[2] is well
+    assert len(c) == 5
+
+
+def test_wells_index_arithmetic_matches_wrapped_list():
+    c = generate_plate(384, 24, (4.5, 4.5), (0, 0), 1.5)
+    children = c.get_children_list()
+    wrapped = children * 3
+    total = len(children)
+
+    for i, well in enumerate(children):
+        assert c.get_index_from_name(well.get_name()) == i
+    assert next(c['A1']) is children[1]
+
+    for start in (0, 5, 383, -3):
+        for length in (1, 8, 400, -8):
+            for step in (1, 3, -2):
+                expected = wrapped[start + total::step][:abs(length)] \
+                    if length > 0 else \
+                    wrapped[start + total::-abs(step)][:-length]
+                selected = c.wells(start, length=length, step=step)
+                if len(expected) == 1:
+                    assert selected is expected[0]
+                else:
+                    assert list(selected) == expected
+
+    assert list(c.wells('A1', to='P1')) == wrapped[total:total + 16]
+    assert list(c.wells('P1', to='A1', step=3)) == \
+        wrapped[total + 15:total - 1:-3]
@@ -1,3 +1,4 @@
+import os
 import pytest
 
 from opentrons.containers import load as containers_load
@@ -60,3 +61,190 @@ def test_invalid_container_name():
         error_type = ValueError
     with pytest.raises(error_type):
         database.load_container("fake_container")
+
+
+def test_load_labware_from_cache(split_labware_def):
+    database.clear_labware_cache()
+    first = database.load_labware('4-well-plate')
+    second = database.load_labware('4-well-plate')
+    assert database.labware_cache_info() == {
+        'hits': 1, 'misses': 1, 'size': 1}
+
+    assert first is not second
+    assert first[0] is not second[0]
+    assert first[0].properties is second[0].properties
+    assert first.ordering == second.ordering
+    assert [w.get_name() for w in first] == [w.get_name() for w in second]
+    assert [w.coordinates() for w in first] == \
+        [w.coordinates() for w in second]
+
+    # Clones are independent from each other and from the prototype
+    first[0]._coordinates = first[0]._coordinates + Vector(1, 1, 1)
+    first.ordering[0].reverse()
+    third = database.load_labware('4-well-plate')
+    assert third[0].coordinates() == second[0].coordinates()
+    assert third.ordering == second.ordering
+
+
+def test_labware_cache_follows_offset_file(split_labware_def):
+    from opentrons.data_storage import labware_definitions as ldef
+
+    database.clear_labware_cache()
+    before = database.load_labware('4-well-plate')['A1'].coordinates()
+    assert before == (50, 30, 130)
+
+    # Written behind the cache's back, picked up from the file stamp
+    ldef._save_offset(
+        ldef.offset_dir(), '4-well-plate', {'x': 0, 'y': 0, 'z': 0})
+    assert database.load_labware('4-well-plate')['A1'].coordinates() == \
+        (40, 40, 30)
+    assert database.labware_cache_info()['misses'] == 2
+
+
+def test_connection_reuse_and_bulk_save(dummy_db):
+    import gc
+    import threading
+    from tests.opentrons import generate_plate
+
+    database.close_connections()
+    db_conn = database._get_db_connection()
+    assert database._get_db_connection() is db_conn
+    assert db_conn.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+
+    # Other threads get their own connection, even when they are given the
+    # id of a thread that finished, and release it when they finish
+    threads = len(database._thread_connections)
+    other = []
+    for _ in range(2):
+        thread = threading.Thread(
+            target=lambda: other.append(database._get_db_connection()))
+        thread.start()
+        thread.join()
+    assert other[0] is not db_conn
+    assert other[1] is not other[0]
+    gc.collect()
+    assert len(database._thread_connections) == threads
+
+    statements = []
+    db_conn.set_trace_callback(statements.append)
+    plate = generate_plate(384, 24, (4.5, 4.5), (0, 0), 1.5, 10)
+    database.save_new_container(plate, '384-test')
+    assert statements.count('COMMIT') == 1
+
+    del statements[:]
+    loaded = database.load_container('384-test')
+    assert len(statements) == 1
+    assert len(loaded) == 384
+    assert loaded['X16'].coordinates() == plate['X16'].coordinates()
+
+    database.delete_container('384-test')
+    assert '384-test' not in database.list_all_containers()
+
+    database.close_connections()
+    assert database._get_db_connection() is not db_conn
+
+
+def test_save_labware_offset(split_labware_def):
+    from opentrons.containers.placeable import Deck, Slot
+    from opentrons.data_storage import labware_definitions as ldef
+    from opentrons.data_storage import serializers
+
+    deck = Deck()
+    slot = Slot()
+    deck.add(slot, '1', (10, 20, 0))
+    labware = database.load_labware('4-well-plate')
+    slot.add(labware, '4-well-plate')
+    labware._coordinates = labware._coordinates + Vector(1.5, 2.25, -3)
+
+    # Offset as calculated from the full serialized definition
+    new_well = serializers.labware_to_json(labware)['wells']['A1']
+    base_well = ldef.load_json(
+        '4-well-plate', with_offset=False)['wells']['A1']
+    expected = {
+        axis: new_well[axis] - base_well[axis] - slot.coordinates()[axis]
+        for axis in 'xyz'}
+    assert ldef.load_first_well('4-well-plate') == ('A1', base_well)
+
+    database.save_labware_offset(labware)
+    assert ldef.load_offset('4-well-plate') == dict(
+        expected, definition=ldef.definition_hash('4-well-plate'))
+    assert database.load_labware('4-well-plate')['A1'].coordinates() == \
+        Vector(40 + 11.5, 40 - 7.75, 30 + 97)
+
+
+def test_offset_visible_before_flush(split_labware_def, dummy_db):
+    import json
+    from opentrons.config import persistence
+    from opentrons.data_storage import labware_definitions as ldef
+
+    assert persistence.delay > 0
+    assert database._get_db_connection().execute(
+        'PRAGMA journal_mode').fetchone() == ('wal',)
+    offset_file = os.path.join(ldef.offset_dir(), '4-well-plate.json')
+    with open(offset_file) as offset_f:
+        on_disk = json.load(offset_f)
+
+    database.load_labware('4-well-plate')
+    ldef.save_labware_offset('4-well-plate', {'x': 0, 'y': 0, 'z': 0})
+    assert database.load_labware('4-well-plate')['A1'].coordinates() == \
+        (40, 40, 30)
+    with open(offset_file) as offset_f:
+        assert json.load(offset_f) == on_disk
+
+    persistence.flush()
+    with open(offset_file) as offset_f:
+        assert json.load(offset_f)['z'] == 0
+    assert database.load_labware('4-well-plate')['A1'].coordinates() == \
+        (40, 40, 30)
+
+
+def test_labware_shared_by_content(split_labware_def, monkeypatch):
+    import shutil
+    from opentrons.data_storage import labware_definitions as ldef
+
+    database.clear_labware_cache()
+    for directory in (ldef.user_defn_dir(), ldef.offset_dir()):
+        shutil.copy(
+            os.path.join(directory, '4-well-plate.json'),
+            os.path.join(directory, 'same-4-well-plate.json'))
+    assert ldef.definition_hash('same-4-well-plate') == \
+        ldef.definition_hash('4-well-plate')
+
+    first = database.load_labware('4-well-plate')
+    second = database.load_labware('same-4-well-plate')
+    assert database._labware_cache['4-well-plate'][1] is \
+        database._labware_cache['same-4-well-plate'][1]
+    assert [w.coordinates() for w in first] == \
+        [w.coordinates() for w in second]
+
+    # Offsets remember the definition they were calibrated against
+    ldef.save_labware_offset('4-well-plate', {'x': 1, 'y': 2, 'z': 3})
+    definition = ldef.load_json('4-well-plate', with_offset=False)
+    definition['wells']['A1']['x'] += 1
+    ldef.save_user_definition(definition)
+    assert ldef.definition_hash('4-well-plate') != \
+        ldef.definition_hash('same-4-well-plate')
+    warnings = []
+    monkeypatch.setattr(ldef.log, 'warning', warnings.append)
+    ldef.load_json('4-well-plate')
+    assert 'calibrated against a different definition' in warnings[0]
+
+
+def test_save_labware_streams_definition(tmpdir, monkeypatch):
+    import json
+    from opentrons.data_storage import labware_definitions as ldef
+    from opentrons.data_storage import serializers
+    from tests.opentrons import generate_plate
+
+    monkeypatch.setattr(ldef, 'user_defn_dir', lambda: str(tmpdir))
+    plate = generate_plate(96, 8, (9, 9), (14.38, 11.24), 3.2, 10.5)
+    expected = serializers.labware_to_json(plate, 'streamed-plate')
+
+    def build_definition(*args):
+        raise AssertionError('definition dict should not be built')
+    monkeypatch.setattr(serializers, 'container_to_json', build_definition)
+    monkeypatch.setattr(serializers, 'labware_to_json', build_definition)
+
+    assert database.save_labware(plate, 'streamed-plate')
+    with open(str(tmpdir.join('streamed-plate.json'))) as defn_f:
+        assert json.load(defn_f) == expected
@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from opentrons.data_storage import labware_bundle
+from opentrons.data_storage import labware_definitions as ldef
+
+repo_defn_dir = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', '..',
+    'labware-definitions', 'definitions'))
+
+
+@pytest.fixture
+def definition_dir(tmpdir):
+    path = str(tmpdir.join('definitions'))
+    shutil.copytree(repo_defn_dir, path)
+    return path
+
+
+def test_bundle_matches_json(definition_dir):
+    labware_bundle.build(definition_dir)
+    bundle = labware_bundle.open_bundle(definition_dir)
+
+    names = sorted(
+        os.path.splitext(name)[0] for name in os.listdir(definition_dir))
+    assert sorted(bundle.names()) == names
+    for name in names:
+        with open(os.path.join(definition_dir, name + '.json')) as defn_f:
+            expected = json.load(defn_f)
+        actual = bundle.definition(name)
+        assert actual == expected
+        assert list(actual['wells']) == list(expected['wells'])
+    assert bundle.definition('not-a-labware') == {}
+
+    columns = bundle.columns('96-flat')
+    assert len(columns['x']) == 96
+    assert bundle.well_names('96-flat')[0] == 'A1'
+
+
+def test_stale_bundle_is_ignored(definition_dir):
+    labware_bundle.build(definition_dir)
+    assert labware_bundle.open_bundle(definition_dir) is not None
+
+    shutil.copy(
+        os.path.join(definition_dir, '96-flat.json'),
+        os.path.join(definition_dir, '96-flat-copy.json'))
+    os.utime(definition_dir, ns=(0, 0))
+    assert labware_bundle.open_bundle(definition_dir) is None
+
+
+def test_edited_definition_is_read(definition_dir, tmpdir):
+    user_dir = str(tmpdir.mkdir('user'))
+    offset_dir = str(tmpdir.mkdir('offsets'))
+    labware_bundle.build(definition_dir)
+    # Cache the bundle before the edit
+    assert ldef._load(
+        definition_dir, user_dir, '96-flat', offset_dir,
+        with_offset=False)['wells']['A1']['depth'] == 10.5
+    dir_stamp = os.stat(definition_dir).st_mtime_ns
+
+    # Edited in place, which leaves the directory stamp as it was
+    path = os.path.join(definition_dir, '96-flat.json')
+    with open(path) as defn_f:
+        definition = json.load(defn_f)
+    definition['wells']['A1']['depth'] = 999
+    with open(path, 'w') as defn_f:
+        json.dump(definition, defn_f)
+    assert os.stat(definition_dir).st_mtime_ns == dir_stamp
+
+    assert labware_bundle.open_bundle(definition_dir) is None
+    assert ldef._load(
+        definition_dir, user_dir, '96-flat', offset_dir,
+        with_offset=False)['wells']['A1']['depth'] == 999
+    assert ldef._definition_hash(definition_dir, user_dir, '96-flat') == \
+        labware_bundle.content_hash(definition)
+    # Definitions that were not edited are still read from the bundle
+    assert ldef._bundled(definition_dir, 'tiprack-200ul') is not None
+
+
+def test_load_from_bundle(definition_dir, tmpdir, monkeypatch):
+    user_dir = str(tmpdir.mkdir('user'))
+    offset_dir = str(tmpdir.mkdir('offsets'))
+    with open(os.path.join(offset_dir, '96-flat.json'), 'w') as offs_f:
+        json.dump({'x': 1, 'y': 2, 'z': 3}, offs_f)
+    expected = ldef._load(
+        definition_dir, user_dir, '96-flat', offset_dir, with_offset=True)
+
+    labware_bundle.build(definition_dir)
+    # Definition files are no longer parsed once the bundle is in place
+    parsed = []
+    load_definition = ldef._load_definition
+    monkeypatch.setattr(ldef, '_load_definition', lambda path, name: (
+        parsed.append(path) or load_definition(path, name)))
+
+    assert ldef._load(
+        definition_dir, user_dir, '96-flat', offset_dir,
+        with_offset=True) == expected
+    assert definition_dir not in parsed
+
+    # User definitions still take precedence
+    user_defn = dict(expected, metadata={'name': '96-flat', 'user': True})
+    ldef._save_user_definition(user_dir, user_defn)
+    assert ldef._load(
+        definition_dir, user_dir, '96-flat', offset_dir,
+        with_offset=False)['metadata']['user']
+
+
+def test_bundle_single_well(definition_dir):
+    labware_bundle.build(definition_dir)
+    bundle = labware_bundle.open_bundle(definition_dir)
+
+    for name in bundle.names():
+        wells = list(bundle.definition(name)['wells'].items())
+        assert bundle.well(name) == wells[0]
+        assert bundle.well(name, len(wells) - 1) == wells[-1]
+        with pytest.raises(IndexError):
+            bundle.well(name, len(wells))
+
+
+def test_content_hash(definition_dir):
+    with open(os.path.join(definition_dir, '96-flat.json')) as defn_f:
+        definition = json.load(defn_f)
+    digest = labware_bundle.content_hash(definition)
+
+    # Name, key order and number formatting do not matter
+    renamed = dict(definition, metadata={'name': 'other'})
+    renamed['wells'] = {
+        name: dict(reversed([
+            (prop, float(value)) for prop, value in well.items()]))
+        for name, well in definition['wells'].items()}
+    assert labware_bundle.content_hash(renamed) == digest
+
+    moved = json.loads(json.dumps(definition))
+    moved['wells']['A1']['x'] += 0.01
+    assert labware_bundle.content_hash(moved) != digest
+
+    labware_bundle.build(definition_dir)
+    bundle = labware_bundle.open_bundle(definition_dir)
+    assert bundle.content_hash('96-flat') == digest
+    # Identical definitions are stored once
+    assert bundle.content_hash('tiprack-10ul') == \
+        bundle.content_hash('tiprack-200ul')
+    assert bundle._labware['tiprack-10ul']['wells'] == \
+        bundle._labware['tiprack-200ul']['wells']
+    assert bundle.definition('tiprack-200ul')['metadata'] == \
+        {'name': 'tiprack-200ul'}
+
+
+def test_unsupported_well_properties(definition_dir, monkeypatch):
+    path = os.path.join(definition_dir, '96-flat.json')
+    with open(path) as defn_f:
+        definition = json.load(defn_f)
+    definition['wells']['A1']['shape'] = 'circular'
+    definition['wells']['A2']['depth'] = None
+    with open(path, 'w') as defn_f:
+        json.dump(definition, defn_f)
+
+    warnings = []
+    monkeypatch.setattr(labware_bundle.log, 'warning', warnings.append)
+    labware_bundle.build(definition_dir)
+    assert len(warnings) == 1
+    assert "['depth', 'shape']" in warnings[0]
+
+    bundle = labware_bundle.open_bundle(definition_dir)
+    assert bundle.definition('96-flat') == definition
+    assert bundle.well('96-flat')[1]['shape'] == 'circular'
+    depth = bundle.columns('96-flat')['depth'][
+        bundle.well_names('96-flat').index('A2')]
+    assert depth != depth  # NaN
+
+
+def test_build_script_does_not_import_opentrons(definition_dir):
+    import subprocess
+    import sys
+
+    script = os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', '..',
+        'compute', 'scripts', 'build_labware_bundle.py'))
+    code = '\n'.join([
+        'import runpy, sys',
+        'sys.argv = [{!r}, {!r}]'.format(script, definition_dir),
+        'try:',
+        '    runpy.run_path(sys.argv[0], run_name="__main__")',
+        'except SystemExit as e:',
+        '    assert not e.code, e.code',
+        'assert "opentrons" not in sys.modules',
+    ])
+    api_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(labware_bundle.__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([api_dir] + sys.path))
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+    assert labware_bundle.open_bundle(definition_dir) is not None
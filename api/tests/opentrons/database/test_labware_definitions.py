@@ -79,7 +79,7 @@ def test_list_labware():
     assert lw[-1] == 'wheaton_vial_rack'
 
 
-def test_save_offset():
+def test_save_offset(write_immediately):
     test_data = {'x': 1, 'y': 2, 'z': -3}
     test_dir = tempfile.mkdtemp()
 
@@ -169,3 +169,27 @@ def test_new_labware_create(split_labware_def):
             assert res[name].properties[prop] == well.properties[prop]
     assert lw.well("C5").coordinates() == (
         (n_cols - 1) * col_space, (n_rows - 1) * row_space, 0)
+
+
+def test_create_1536_well_plate(dummy_db):
+    from opentrons import containers
+    lw_name = '1536-test-plate'
+
+    res = containers.create(
+        lw_name, (48, 32), (2.25, 2.25), 1.5, 5, 10, save=False)
+    assert len(res.wells()) == 1536
+    assert res.get_type() == lw_name
+    assert res.well('AF48').coordinates() == (47 * 2.25, 31 * 2.25, 0)
+    assert [w.get_name() for w in res.rows('Z')][:2] == ['Z1', 'Z2']
+    assert res.ordering[0][-1] == 'AF1'
+    assert all(w.properties is res[0].properties for w in res)
+    # Nothing saved
+    assert lw_name not in containers.list()
+
+    containers.create(lw_name, (48, 32), (2.25, 2.25), 1.5, 5, 10)
+    # Loading waits for the save started in the background
+    lw = database.load_container(lw_name)
+    database.delete_container(lw_name)
+    assert [w.get_name() for w in lw] == [w.get_name() for w in res]
+    assert [w.coordinates() for w in lw] == [w.coordinates() for w in res]
+    assert lw[0].properties == res[0].properties
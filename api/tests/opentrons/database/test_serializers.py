@@ -56,3 +56,37 @@ def test_seralizer_all_containers():
 
         assert json_from_container['ordering'] == json_from_file['ordering']
         assert json_from_container['wells'] == json_from_file['wells']
+
+
+def legacy_labware_to_json(container, container_name):
+    wells = {}
+    for well_name, well in container.children_by_name.items():
+        x, y, z = map(lambda num: round(num, 3), well.coordinates())
+        wells[well_name] = {'x': x, 'y': y, 'z': z}
+        wells[well_name].update(well.properties)
+    return {
+        'metadata': {'name': container_name},
+        'wells': wells,
+        'ordering': container.ordering
+    }
+
+
+def test_streaming_serializer():
+    import json
+    from opentrons.containers.placeable import Deck, Slot
+    from tests.opentrons import generate_plate
+
+    deck = Deck()
+    slot = Slot()
+    deck.add(slot, '1', (0.1, 0.2, 0.3))
+    plate = generate_plate(96, 8, (9, 9), (14.38, 11.24), 3.2, 10.5)
+    slot.add(plate, 'plate', (0.7, 1.3, 1e-4))
+
+    expected = legacy_labware_to_json(plate, 'plate')
+    assert ser.labware_to_json(plate) == expected
+    assert ser.well_to_json(plate['H12']) == expected['wells']['H12']
+    assert dict(ser.iter_wells(plate)) == expected['wells']
+
+    chunks = list(ser.iter_labware_json(plate))
+    assert ''.join(chunks) == json.dumps(expected)
+    assert len(chunks) == 96 + 2
@@ -0,0 +1,95 @@
+"""
+Smoothieboard stand-in on a pseudo-terminal, for driving the real serial
+stack (pyserial and the asyncio transport) in tests without hardware.
+
+    with FakeSmoothie() as smoothie:
+        connection = serial_communication._connect(smoothie.port, 115200)
+
+Every line received is answered with `ok`, preceded by a reply for the
+commands that have one (M114.2, M119, version). Moves and homes update the
+reported position. `received` holds the lines received, `delay` seconds are
+waited before answering each chunk of input.
+"""
+import os
+import re
+import select
+import threading
+import time
+import tty
+
+AXES = 'XYZABC'
+HOME_POSITION = {
+    'X': 418, 'Y': 353, 'Z': 218, 'A': 218, 'B': 19, 'C': 19}
+
+_WORD = re.compile(r'([A-Z])(-?[\d.]+)')
+
+
+class FakeSmoothie:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.received = []
+        self.position = {axis: 0.0 for axis in AXES}
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        self.port = os.ttyname(self._slave)
+        self._buffer = b''
+        self._running = False
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _serve(self):
+        while self._running:
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            self._buffer += os.read(self._master, 4096)
+            *lines, self._buffer = self._buffer.split(b'\n')
+            if not lines:
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            replies = ''.join(
+                self._reply(line.rstrip(b'\r').decode().strip())
+                for line in lines)
+            os.write(self._master, replies.encode())
+
+    def _reply(self, line):
+        self.received.append(line)
+        reply = ''
+        for command in line.split():
+            if command.startswith(('G0', 'G1')):
+                self.position.update(
+                    (axis, float(value))
+                    for axis, value in _WORD.findall(command[2:])
+                    if axis in AXES)
+            elif command.startswith('G28.2'):
+                for axis in command[5:] or AXES:
+                    self.position[axis] = HOME_POSITION[axis]
+            elif command == 'M114.2':
+                reply += 'ok MCS: {}\r\n'.format(' '.join(
+                    '{}:{:.4f}'.format(axis, self.position[axis])
+                    for axis in AXES))
+            elif command == 'M119':
+                reply += ' '.join(
+                    '{}_max:0'.format(axis) for axis in AXES) + \
+                    ' Probe: 0\r\n'
+            elif command == 'version':
+                reply += 'Build version: fake, Build date: now\r\n'
+        return reply + 'ok\r\n'
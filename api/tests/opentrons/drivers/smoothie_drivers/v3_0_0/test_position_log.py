@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from opentrons.drivers.smoothie_drivers.position_log import PositionLog
+
+
+def test_ring_buffer_keeps_latest():
+    log = PositionLog('XY', size=3)
+    assert len(log) == 0
+    assert list(log) == []
+    for i in range(5):
+        log.append({'X': i, 'Y': -i}, timestamp=100 + i)
+
+    assert len(log) == 3
+    assert log.dropped == 2
+    assert list(log) == [
+        {'X': 2, 'Y': -2}, {'X': 3, 'Y': -3}, {'X': 4, 'Y': -4}]
+    assert log[0] == {'X': 2, 'Y': -2}
+    assert log[-1] == {'X': 4, 'Y': -4}
+    with pytest.raises(IndexError):
+        log[3]
+
+    timestamps, positions = log.to_arrays()
+    assert timestamps.tolist() == [102, 103, 104]
+    assert positions.tolist() == [[2, -2], [3, -3], [4, -4]]
+    positions[0, 0] = 99
+    assert log[0]['X'] == 2
+
+    log.clear()
+    assert len(log) == 0
+    assert log.dropped == 0
+
+    with pytest.raises(ValueError):
+        PositionLog('XY', size=0)
+
+
+def test_save(tmpdir):
+    log = PositionLog('XY')
+    log.append({'X': 1, 'Y': 2, 'Z': 3}, timestamp=5)
+    path = str(tmpdir.join('positions.npz'))
+    log.save(path)
+    with np.load(path) as saved:
+        assert saved['axes'].tolist() == ['X', 'Y']
+        assert saved['timestamps'].tolist() == [5]
+        assert saved['positions'].tolist() == [[1, 2]]
+
+
+def test_driver_log_bounded(monkeypatch):
+    from opentrons.drivers.smoothie_drivers.driver_3_0 import \
+        SmoothieDriver_3_0_0
+    from opentrons.robot.robot_configs import load
+    monkeypatch.setenv('OT_SMOOTHIE_POSITION_LOG_SIZE', '10')
+    driver = SmoothieDriver_3_0_0(config=load())
+    driver.home()
+    for i in range(50):
+        driver.move({'X': i})
+
+    assert len(driver.log) == 10
+    assert [position['X'] for position in driver.log] == list(range(40, 50))
+    assert driver.log[-1] == driver.position
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from opentrons.drivers.smoothie_drivers import async_serial
+from opentrons.drivers.smoothie_drivers import serial_communication
+from tests.opentrons.drivers.fake_smoothie import FakeSmoothie
+
+ACK = 'ok\r\nok\r\n'
+
+
+@pytest.fixture
+def fake_smoothie():
+    with FakeSmoothie() as smoothie:
+        connection = serial_communication._connect(smoothie.port, 115200)
+        yield smoothie, connection
+        connection.close()
+
+
+def test_send_command_awaitable(fake_smoothie):
+    smoothie, connection = fake_smoothie
+    loop = asyncio.new_event_loop()
+    transport = async_serial.AsyncSerial(connection, loop=loop)
+
+    async def commands():
+        # Sent concurrently, answered one at a time
+        return await asyncio.gather(
+            transport.send_command('G0X10Y20 M400\r\n\r\n', ACK),
+            transport.send_command('M114.2 M400\r\n\r\n', ACK),
+            transport.send_command('version\r\n\r\n', ACK))
+
+    async def blocking_command():
+        transport.write_and_return('version\r\n\r\n', ACK)
+
+    try:
+        move, position, version = loop.run_until_complete(commands())
+        # Waiting on the loop from the thread running it would never return
+        with pytest.raises(RuntimeError):
+            loop.run_until_complete(blocking_command())
+    finally:
+        loop.close()
+    assert move == ''
+    assert position.startswith('ok MCS: X:10.0000 Y:20.0000')
+    assert version == 'Build version: fake, Build date: now'
+    assert smoothie.received == [
+        'G0X10Y20 M400', '', 'M114.2 M400', '', 'version', '']
+
+
+def test_send_command_timeout(fake_smoothie):
+    smoothie, connection = fake_smoothie
+    smoothie.delay = 0.5
+    transport = async_serial.transport_for(connection)
+    assert async_serial.transport_for(connection) is transport
+
+    async def command():
+        return await transport.send_command('M119\r\n\r\n', ACK, timeout=0.1)
+
+    loop = asyncio.new_event_loop()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run_until_complete(command())
+    finally:
+        loop.close()
+
+    # The blocking wrapper keeps returning an empty response on timeout
+    assert serial_communication.write_and_return(
+        'M119\r\n\r\n', ACK, connection, timeout=0.1) == ''
+    smoothie.delay = 0
+    assert serial_communication.write_and_return(
+        'M119\r\n\r\n', ACK, connection).endswith('Probe: 0')
+
+    async def blocking_command():
+        transport.write_and_return('M119\r\n\r\n', ACK)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run_coroutine_threadsafe(
+            blocking_command(), transport.loop).result()
+
+
+class _NoFilenoSerial:
+    """
+    A port without a file descriptor, like pyserial's socket:// and loop://
+    ports
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    @property
+    def in_waiting(self):
+        return self._connection.in_waiting
+
+    def reset_input_buffer(self):
+        self._connection.reset_input_buffer()
+
+    def write(self, data):
+        return self._connection.write(data)
+
+    def read(self, size=1):
+        return self._connection.read(size)
+
+
+def test_blocking_read_fallback(fake_smoothie):
+    smoothie, connection = fake_smoothie
+
+    # A loop that cannot watch file descriptors, like the proactor loop
+    loop = asyncio.new_event_loop()
+
+    def add_reader(fd, callback, *args):
+        raise NotImplementedError
+    loop.add_reader = add_reader
+
+    async def commands(transport):
+        smoothie.delay = 0.3
+        with pytest.raises(asyncio.TimeoutError):
+            await transport.send_command('M119\r\n\r\n', ACK, timeout=0.1)
+        # Waited for by the next command, before it writes
+        assert transport._pending_read is not None
+        smoothie.delay = 0
+        return await transport.send_command('version\r\n\r\n', ACK)
+
+    try:
+        for transport in (
+                async_serial.AsyncSerial(
+                    _NoFilenoSerial(connection), loop=loop),
+                async_serial.AsyncSerial(connection, loop=loop)):
+            assert loop.run_until_complete(commands(transport)) == \
+                'Build version: fake, Build date: now'
+            assert transport._watch_fd is False
+    finally:
+        loop.close()
+
+
+def test_driver_over_pty(monkeypatch):
+    from opentrons.drivers.smoothie_drivers.driver_3_0 import \
+        SmoothieDriver_3_0_0
+    from opentrons.robot.robot_configs import load
+    monkeypatch.setenv('ENABLE_VIRTUAL_SMOOTHIE', 'false')
+
+    with FakeSmoothie() as smoothie:
+        driver = SmoothieDriver_3_0_0(config=load())
+        driver.connect(port=smoothie.port)
+        try:
+            assert driver.is_connected()
+            driver.move({'X': 100, 'Y': 50})
+            assert smoothie.position['X'] == 100
+            assert smoothie.position['Y'] == 50
+            driver.update_position()
+            assert driver.position['X'] == 100
+            assert driver.position['Y'] == 50
+        finally:
+            driver.disconnect()
@@ -136,25 +136,20 @@ def test_plunger_commands(smoothie, monkeypatch):
         ['M907 A1.0 B0.5 C0.5 Z1.0 M400'],     # Set axes motors high
         ['G4P0.05 M400'],                      # Dwell
         ['G28.2[ABCZ]+ M400'],                 # Home
-        ['M907 A0.1 B0.1 C0.1 Z0.1 M400'],     # Set axes motors low
-        ['G4P0.05 M400'],                      # Dwell
-
-        ['M907 Y0.8 M400'],                    # set Y motor to low current
+        # Set axes motors low, merged with setting Y motor to low current
+        ['M907 A0.1 B0.1 C0.1 Y0.8 Z0.1 M400'],
         ['G4P0.05 M400'],                      # delay for current
         ['G0F3000 M400'],                      # set Y motor to low speed
         ['G91 G0Y-20 G90 M400'],               # move Y motor away from switch
         ['M907 Y0.3 M400'],  # set current back
         ['G4P0.05 M400'],                      # delay for current
         ['G0F24000 M400'],                      # set back to default speed
-        ['M907 Y0.3 M400'],                    # activate X motor for HOME
-        ['G4P0.05 M400'],
+        # Y is already dwelling
         ['M907 X1.5 M400'],                    # activate X motor for HOME
         ['G4P0.05 M400'],
         ['G28.2X M400'],                       # home X
-        ['M907 X0.3 M400'],                    # end of HOME dwells X axis
-        ['G4P0.05 M400'],
-
-        ['M907 Y1.75 M400'],
+        # end of HOME dwells X axis, merged with activating Y for HOME
+        ['M907 X0.3 Y1.75 M400'],
         ['G4P0.05 M400'],
         ['G28.2Y M400'],                        # home Y
         ['M203.1 Y8 M400'],                     # lower speed on Y for retract
@@ -169,6 +164,7 @@ def test_plunger_commands(smoothie, monkeypatch):
     # for i in range(len(expected)):
     #     print(expected[i][0] == command_log[i], expected[i], command_log[i])
     fuzzy_assert(result=command_log, expected=expected)
+    assert smoothie.suppressed['SET_CURRENT'] == 3
     command_log = []
 
     smoothie.move({'X': 0, 'Y': 1.123456, 'Z': 2, 'A': 3})
@@ -546,3 +542,147 @@ def test_pause_in_protocol(model):
     model.robot.pause()
 
     assert model.robot._driver.run_flag.is_set()
+
+
+def test_pipelined_commands(smoothie, monkeypatch):
+    from opentrons.drivers.smoothie_drivers import serial_communication
+    from opentrons.drivers.smoothie_drivers import driver_3_0
+    command_log = []
+    smoothie._setup()
+    smoothie.home()
+    smoothie.activate_axes('XYZA')
+    smoothie.simulating = False
+    smoothie.pipelined = True
+
+    def write_with_log(command, ack, connection, timeout):
+        command_log.append((command.strip(), ack))
+        return ack
+
+    monkeypatch.setattr(serial_communication, 'write_and_return',
+                        write_with_log)
+
+    # The gantry is already active, so consecutive moves are only streamed
+    smoothie.move({'X': 10, 'Y': 10})
+    smoothie.move({'X': 20})
+    smoothie.set_speed(100)
+    smoothie.move({'Z': 100})
+    # Plunger moves wait for queued motion before raising the current and
+    # again before it is lowered once the plunger is done
+    smoothie.move({'B': 2})
+    smoothie.wait_for_motion()
+    smoothie.wait_for_motion()
+    line = driver_3_0.SMOOTHIE_LINE_ACK
+    command = driver_3_0.SMOOTHIE_ACK
+    assert command_log == [
+        ('G0X10Y10', line),
+        ('G0X20', line),
+        ('G0F6000', line),
+        ('G0Z100', line),
+        ('M400 M907 B0.5 M400', command),
+        ('G4P0.05', line),
+        ('G0B2', line),
+        ('M400 M907 B0.1 M400', command),
+        ('G4P0.05', line),
+        ('M400 M400', command),
+    ]
+    assert smoothie.position['X'] == 20
+
+
+def test_pipelined_pause_and_errors(smoothie, monkeypatch):
+    from opentrons.drivers.smoothie_drivers import serial_communication
+    from opentrons.drivers.smoothie_drivers import driver_3_0
+    command_log = []
+    smoothie._setup()
+    smoothie.home()
+    smoothie.activate_axes('XYZA')
+    smoothie.simulating = False
+    smoothie.pipelined = True
+    alarm = 'ALARM: Hard limit -Y'
+    alarms = []
+
+    def write_with_log(command, ack, connection, timeout):
+        command_log.append(command.strip())
+        if alarms and command.startswith('M400 '):
+            # The alarm raised by a streamed move is only reported at the
+            # next sync point
+            return alarms.pop()
+        if driver_3_0.GCODES['CURRENT_POSITION'] in command:
+            return 'ok M114.2 X:10 Y:20: Z:30 A:40 B:50 C:60'
+        return ack
+
+    monkeypatch.setattr(serial_communication, 'write_and_return',
+                        write_with_log)
+
+    # Paused only once the streamed moves are done
+    smoothie.move({'X': 10, 'Y': 10})
+    smoothie.pause()
+    assert command_log == ['G0X10Y10', 'M400 M400']
+    assert not smoothie.run_flag.is_set()
+    smoothie.resume()
+
+    # The error names the streamed moves it may have come from
+    del command_log[:]
+    smoothie.move({'Y': 20})
+    smoothie.move({'Y': 30})
+    alarms.append(alarm)
+    with pytest.raises(driver_3_0.SmoothieError) as error:
+        # Raising the plunger current is a sync point
+        smoothie.move({'B': 1})
+    assert str(error.value) == \
+        alarm + ' (while running streamed commands: G0Y20, G0Y30)'
+    # The reset dropped them, only the homing that followed is left
+    assert 'G0Y30' not in smoothie._streamed_commands
+
+    # A halt drops whatever was streamed
+    smoothie.move({'Y': 40})
+    monkeypatch.setattr(smoothie, '_smoothie_hard_halt', lambda: None)
+    monkeypatch.setattr(smoothie, '_setup', lambda: None)
+    smoothie.kill()
+    del command_log[:]
+    smoothie.wait_for_motion()
+    assert command_log == []
+
+
+def test_redundant_commands_suppressed(smoothie, monkeypatch):
+    from opentrons.drivers.smoothie_drivers import serial_communication
+    command_log = []
+    smoothie.simulating = False
+
+    def write_with_log(command, ack, connection, timeout):
+        command_log.append(command.strip())
+        return ack
+
+    monkeypatch.setattr(serial_communication, 'write_and_return',
+                        write_with_log)
+
+    smoothie.set_speed(100)
+    smoothie.set_speed(100)
+    smoothie.set_axis_max_speed({'X': 600, 'Y': 400})
+    smoothie.set_axis_max_speed({'X': 600, 'Y': 300})
+    smoothie.set_axis_max_speed({'Y': 300})
+    smoothie.set_current({'B': 0.5})
+    smoothie.set_current({'B': 0.5})
+    smoothie.dwell_axes('B')
+    smoothie.dwell_axes('B')
+    expected = [
+        ['G0F6000 M400'],
+        ['M203.1 X600 Y400 M400'],
+        ['M203.1 Y300 M400'],
+        ['M907 B0.5 M400'],
+        ['G4P0.05 M400'],
+        ['M907 B0.1 M400'],
+        ['G4P0.05 M400'],
+    ]
+    fuzzy_assert(result=command_log, expected=expected)
+    assert smoothie.suppressed == {
+        'SET_CURRENT': 1, 'SET_SPEED': 1, 'SET_MAX_SPEED': 1}
+
+    # Nothing is assumed about Smoothieware's settings after a reset
+    smoothie._forget_sent_settings()
+    smoothie.set_speed(100)
+    assert command_log[-1] == 'G0F6000 M400'
+
+    smoothie.optimize_commands = False
+    smoothie.set_speed(100)
+    assert command_log[-1] == 'G0F6000 M400'
+    assert len(command_log) == len(expected) + 2
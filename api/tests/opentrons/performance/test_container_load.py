@@ -0,0 +1,80 @@
+"""
+Loading every container of the database with the indexed single JOIN query,
+against the previous two queries per container without an index on
+ContainerWells
+"""
+from opentrons.containers.placeable import Container, Well
+from opentrons.data_storage import database, database_migration
+from opentrons.data_storage import database_queries as db_queries
+from opentrons.data_storage.schema_changes import \
+    create_index_ContainerWells_container_name
+from opentrons.util.vector import Vector
+
+
+def legacy_load(db, container_name):
+    container_type, *rel_coords = db_queries.get_container_by_name(
+        db, container_name)
+    container = Container()
+    container.properties['type'] = container_type
+    container._coordinates = Vector(rel_coords)
+    for well_data in db_queries.get_wells_by_container_name(
+            db, container_name):
+        _, location, x, y, z, depth, volume, diameter, length, width = \
+            well_data
+        props = zip(['depth', 'total-liquid-volume',
+                     'diameter', 'length', 'width'],
+                    [depth, volume, diameter, length, width])
+        well = Well(properties={k: v for k, v in props if v})
+        container.add(
+            well, location,
+            (x - well.x_size() / 2, y - well.y_size() / 2, z))
+    return container
+
+
+def load_all(load, db, names):
+    return [load(db, name) for name in names]
+
+
+def count_statements(db, function):
+    statements = []
+    db.set_trace_callback(statements.append)
+    try:
+        result = function()
+    finally:
+        db.set_trace_callback(None)
+    return result, [
+        statement for statement in statements
+        if statement.lstrip().upper().startswith('SELECT')]
+
+
+def test_load_all_containers(dummy_db):
+    db = database._get_db_connection()
+    # Modules are stored as containers without wells
+    names = [
+        name for name, in db.execute(
+            'SELECT DISTINCT container_name FROM ContainerWells')]
+    assert len(names) > 50
+
+    legacy, legacy_queries = count_statements(
+        db, lambda: load_all(legacy_load, db, names))
+    assert len(legacy_queries) == 2 * len(names)
+
+    database_migration.execute_schema_change(
+        db, create_index_ContainerWells_container_name)
+    plan = db.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM ContainerWells '
+        'WHERE container_name=?', ('96-flat',)).fetchall()
+    assert 'ContainerWells_container_name' in str(plan)
+
+    current, queries = count_statements(
+        db, lambda: load_all(
+            database._load_container_object_from_db, db, names))
+    assert len(queries) == len(names)
+    assert all('JOIN' in query.upper() for query in queries)
+
+    for old, new in zip(legacy, current):
+        assert old.get_type() == new.get_type()
+        assert old._coordinates == new._coordinates
+        assert [w.get_name() for w in old] == [w.get_name() for w in new]
+        assert [w.properties for w in old] == [w.properties for w in new]
+        assert [w._coordinates for w in old] == [w._coordinates for w in new]
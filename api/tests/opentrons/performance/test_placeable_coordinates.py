@@ -0,0 +1,98 @@
+"""
+Memoized Placeable coordinates, checked against the previous implementation,
+which summed the parent chain on every call
+"""
+import functools
+
+import pytest
+
+from opentrons.containers.placeable import Deck, Placeable, Slot
+from opentrons.util.vector import Vector
+from tests.opentrons import generate_plate
+
+
+def legacy_coordinates(placeable, reference=None):
+    coordinates = [i._coordinates for i in placeable.get_trace(reference)]
+    return functools.reduce(lambda a, b: a + b, coordinates)
+
+
+@pytest.fixture
+def deck():
+    deck = Deck()
+    for i in range(2):
+        slot = Slot()
+        deck.add(slot, str(i + 1), (i * 132.5, 0, 0))
+        slot.add(
+            generate_plate(96, 8, (9, 9), (14, 11), 3.2, 10.5),
+            'plate',
+            (0, 0, 0))
+    return deck
+
+
+def transfer(deck):
+    # Aspirate from every well of the source plate and dispense into the
+    # matching well of the destination, resolving each location on the deck
+    # the same way a pipette does when it moves between wells
+    source, dest = [deck[slot]['plate'] for slot in ('1', '2')]
+    for a, b in zip(source, dest):
+        a.top(reference=deck)
+        a.bottom(reference=deck)
+        b.top(reference=deck)
+        b.bottom(reference=deck)
+
+
+def test_coordinates_match_legacy(deck):
+    for slot in deck:
+        for well in slot['plate']:
+            for reference in (None, deck, slot):
+                assert well.coordinates(reference) == \
+                    legacy_coordinates(well, reference)
+
+
+def test_transfer_walks_each_trace_once(deck, monkeypatch):
+    traces = []
+    get_trace = Placeable.get_trace
+
+    def counting_get_trace(self, reference=None):
+        traces.append(self)
+        return get_trace(self, reference)
+
+    monkeypatch.setattr(Placeable, 'get_trace', counting_get_trace)
+    transfer(deck)
+    # Once per well of both plates, top and bottom included
+    assert len(traces) == 2 * 96
+
+    del traces[:]
+    transfer(deck)
+    assert traces == []
+
+    # Calibrating one plate only resolves its own wells again
+    plate = deck['1']['plate']
+    plate._coordinates = plate._coordinates + Vector(1, 0, 0)
+    transfer(deck)
+    assert len(traces) == 96
+    assert all(well.parent is plate for well in traces)
+
+
+def test_coordinates_invalidated_by_calibration(deck):
+    plate = deck['1']['plate']
+    well = plate['H12']
+    before = well.coordinates(deck)
+
+    # Offsets are applied the same way calibrate_container_with_delta does
+    plate._coordinates = plate._coordinates + Vector(1, 2, 3)
+    assert well.coordinates(deck) == before + Vector(1, 2, 3)
+
+    deck['1']._coordinates = deck['1']._coordinates + Vector(0, 0, -3)
+    assert well.coordinates(deck) == before + Vector(1, 2, 0)
+    assert well.coordinates(plate) == legacy_coordinates(well, plate)
+
+
+def test_coordinates_invalidated_by_reparent(deck):
+    plate = deck['1']['plate']
+    well = plate['A1']
+    well.coordinates(deck)
+
+    deck['2'].add(plate, 'other', (0, 0, 0))
+    assert well.coordinates(deck) == legacy_coordinates(well, deck)
+    assert well.coordinates(deck)['x'] > 132.5
@@ -0,0 +1,81 @@
+"""
+Pose tree traversal, checked against the previous recursive implementation
+(list concatenation with sum() and recursive ascend)
+"""
+import pytest
+
+from opentrons.trackers.pose_tracker import (
+    Point, init, add_many, descendants, iter_descendants, ascend, ROOT
+)
+
+
+def recursive_descendants(state, obj, level=0):
+    return sum([
+        [(child, level)] + recursive_descendants(state, child, level + 1)
+        for child in state[obj].children
+    ], [])
+
+
+def recursive_ascend(state, start, finish=ROOT):
+    if start is finish:
+        return [finish]
+    return [start] + recursive_ascend(
+        state, start=state[start].parent, finish=finish)
+
+
+@pytest.fixture
+def deck():
+    # Twelve slots with a 1536 well plate each
+    state = init()
+    slots = ['slot-{}'.format(i) for i in range(12)]
+    state = add_many(state, slots)
+    for slot in slots:
+        plate = '{}-plate'.format(slot)
+        state = add_many(state, [plate], parent=slot)
+        state = add_many(
+            state,
+            ['{}-{}'.format(plate, i) for i in range(1536)],
+            parent=plate,
+            points=[Point(i % 48, i // 48, 0) for i in range(1536)])
+    return state
+
+
+def test_descendants_visits_only_subtree(deck):
+    plate = 'slot-0-plate'
+    assert descendants(deck, ROOT) == recursive_descendants(deck, ROOT)
+    assert descendants(deck, plate) == recursive_descendants(deck, plate)
+
+    # Every node is visited once, and only nodes below the plate are
+    visited = []
+    wells = list(iter_descendants(
+        deck, plate, prune=lambda obj: visited.append(obj)))
+    assert len(wells) == 1536
+    assert visited == [well for well, _ in wells]
+
+
+def test_lazy_traversal(deck):
+    # Only the first few nodes are visited when iteration stops early
+    first = next(iter_descendants(deck, ROOT))
+    assert first == ('slot-0', 0)
+
+    slots = list(iter_descendants(deck, ROOT, max_depth=1))
+    assert len(slots) == 12
+
+    plates = list(iter_descendants(
+        deck, ROOT, prune=lambda obj: obj.endswith('plate')))
+    assert len(plates) == 24
+
+
+def test_deep_tree():
+    depth = 5000
+    state = init()
+    parent = ROOT
+    for i in range(depth):
+        state = add_many(state, [i], parent=parent)
+        parent = i
+
+    with pytest.raises(RecursionError):
+        recursive_ascend(state, depth - 1)
+
+    assert len(ascend(state, depth - 1)) == depth + 1
+    assert len(descendants(state, ROOT)) == depth
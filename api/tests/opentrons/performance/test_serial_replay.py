@@ -0,0 +1,65 @@
+"""
+A protocol run against a recording of its serial traffic. The recording is
+made here against the fake Smoothie; a recording made on a robot replays the
+same way, with serial_communication.replay_latency_scale set to 1 to measure
+its wall time
+"""
+import os
+
+import pytest
+
+from opentrons.drivers.smoothie_drivers import serial_communication
+from opentrons.drivers.smoothie_drivers import serial_log
+from tests.opentrons.drivers.fake_smoothie import FakeSmoothie
+
+PROTOCOL = os.path.join(
+    os.path.dirname(__file__), '..', 'data', 'bradford_assay.py')
+
+
+def run_protocol(robot, port, monkeypatch):
+    from opentrons.drivers.smoothie_drivers.driver_3_0 import \
+        SmoothieDriver_3_0_0
+    # Start every run from the same driver state, homing updates it
+    monkeypatch.setattr(
+        robot, '_driver', SmoothieDriver_3_0_0(config=robot.config))
+    robot.reset()
+    robot.connect(port=port)
+    robot.home()
+    with open(PROTOCOL) as protocol_f:
+        code = compile(protocol_f.read(), PROTOCOL, 'exec')
+    exec(code, {})
+
+
+@pytest.fixture
+def connected_robot(dummy_db, monkeypatch):
+    from opentrons import robot
+    monkeypatch.setenv('ENABLE_VIRTUAL_SMOOTHIE', 'false')
+    yield robot
+    robot._driver.disconnect()
+    monkeypatch.undo()
+    robot.reset()
+
+
+def test_replay_bradford_assay(connected_robot, tmpdir, monkeypatch):
+    log_path = str(tmpdir.join('bradford_assay.otser'))
+    with FakeSmoothie() as smoothie:
+        with serial_communication.recording(log_path):
+            run_protocol(connected_robot, smoothie.port, monkeypatch)
+        connected_robot._driver.disconnect()
+    records = serial_log.read(log_path)
+    assert len(records) > 100
+    assert records[-1].command.startswith(smoothie.received[-2])
+
+    monkeypatch.setattr(serial_communication, 'replay_latency_scale', 0)
+    run_protocol(
+        connected_robot, serial_log.REPLAY_PREFIX + log_path, monkeypatch)
+    replay = connected_robot._driver._connection
+    assert isinstance(replay, serial_log.Replay)
+    # The same commands, in the same order, as when recorded
+    assert replay.commands == len(records)
+    assert replay.remaining() == 0
+
+    # A changed command stream is reported, not silently answered
+    replay = serial_log.Replay(log_path, latency_scale=0)
+    with pytest.raises(serial_log.ReplayMismatch):
+        replay.write_and_return('M999\r\n', 'ok\r\n')
@@ -0,0 +1,73 @@
+"""
+Memory used by a full deck of 384 well plates, with wells sharing their
+geometry, against wells that each carry their own properties, children dicts
+and attribute dict (as they did before WellGeometry)
+"""
+import tracemalloc
+from collections import OrderedDict
+
+from opentrons.containers.placeable import (
+    Container, Deck, Placeable, Slot, Well
+)
+from opentrons.util.vector import Vector
+
+
+class LegacyWell(Placeable):
+    # No __slots__, so instances get a __dict__ like before
+    def __init__(self, properties):
+        super(LegacyWell, self).__init__(properties=properties)
+        self.children_by_name = OrderedDict()
+        self.children_by_reference = OrderedDict()
+        self._coordinates = Vector(0, 0, 0)
+
+
+def build_deck(well_class):
+    deck = Deck()
+    for i in range(12):
+        slot = Slot()
+        deck.add(slot, str(i + 1), (i % 3 * 132.5, i // 3 * 90.5, 0))
+        plate = Container()
+        for n in range(384):
+            row, col = divmod(n, 24)
+            # Every well gets its own dict, as json_to_labware does
+            well = well_class(properties={
+                'depth': 11.56, 'diameter': 3.1,
+                'total-liquid-volume': 55})
+            plate.add(
+                well,
+                chr(row + ord('A')) + str(col + 1),
+                (col * 4.5, row * 4.5, 0))
+        slot.add(plate, 'plate')
+    return deck
+
+
+def measure(well_class):
+    tracemalloc.start()
+    try:
+        deck = build_deck(well_class)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return deck, size
+
+
+# Everything a well costs: the well, its coordinates and its entries in the
+# container's children tables (about 550 bytes on CPython 3.13)
+MAX_BYTES_PER_WELL = 700
+
+
+def test_full_deck_memory():
+    legacy_deck, _ = measure(LegacyWell)
+    deck, size = measure(Well)
+    wells = [well for slot in deck for well in slot['plate']]
+    assert len(wells) == 12 * 384
+    assert size / len(wells) < MAX_BYTES_PER_WELL
+
+    assert not hasattr(wells[0], '__dict__')
+    assert all(well.properties is wells[0].properties for well in wells)
+    assert wells[0].properties == legacy_deck['1']['plate'][0].properties
+    # Nothing is allocated per well until it is used
+    assert all(well._coordinates_cache is None for well in wells)
+    assert all(well._child_table is None for well in wells)
+    wells[0].coordinates(deck)
+    assert wells[0]._coordinates_cache is not None
@@ -1,7 +1,8 @@
 import pytest
 from opentrons.trackers.pose_tracker import (
     Point, Node, add, descendants, ascend, change_base, max_z,
-    update, remove, translate, init, ROOT, has_children
+    update, remove, translate, init, ROOT, has_children, add_many,
+    absolute, absolute_many, change_base_many
 )
 from numpy import isclose, array, ndarray
 
@@ -128,6 +129,12 @@ def test_absolute(state):
 
 def test_max_z(state):
     assert max_z(state, '1') == 23.0
+    assert max_z(state, '1-1') == 0.0
+    # As max() of no descendants
+    with pytest.raises(ValueError):
+        max_z(state, '1-2')
+    with pytest.raises(ValueError):
+        max_z(state, '1-1-1')
 
 
 def test_update(state):
@@ -150,3 +157,103 @@ def test_change_base():
         .add('1-1', parent='1', point=Point(1, 0, 0))
 
     assert isclose(change_base(state, src='1-1'), (0.5, 0, 0)).all()
+
+
+def test_add_many(state):
+    state = add_many(
+        state,
+        ['1-3', '1-4', '1-5'],
+        parent='1',
+        points=[Point(1, 0, 0), Point(2, 0, 0), Point(3, 0, 0)])
+    assert [obj for obj, _ in descendants(state, '1')][-3:] == \
+        ['1-3', '1-4', '1-5']
+    assert (change_base(state, src='1-4') == (3, 2, 3)).all()
+
+    with pytest.raises(AssertionError):
+        add_many(state, ['1-3'], parent='1')
+
+
+def test_add_grows_storage():
+    state = init()
+    for i in range(1000):
+        state = add(state, i, point=Point(i, 0, 0))
+    assert len(state) == 1001
+    assert (change_base(state, src=999) == (999, 0, 0)).all()
+
+
+def test_remove_reuses_slots(state):
+    state = remove(state, '1')
+    state = add(state, '3', parent='2-1', point=Point(1, 1, 1))
+    assert descendants(state, '2') == [('2-1', 0), ('3', 1), ('2-2', 0)]
+    assert (change_base(state, src='3') == (-11, -13, -15)).all()
+
+
+def test_cached_transforms_follow_updates(state):
+    assert (change_base(state, src='1-1-1') == (12, 14, 16)).all()
+    assert (change_base(state, src='2-1') == (-12, -14, -16)).all()
+
+    state = update(state, '1', Point(0, 0, 0))
+    assert (change_base(state, src='1-1-1') == (11, 12, 13)).all()
+    assert (change_base(state, src='1-1-1', dst='1-2') == (-10, -10, -10)) \
+        .all()
+
+    state = update(state, '1-1', Point(1, 1, 1))
+    assert (change_base(state, src='1-1-1') == (1, 1, 1)).all()
+    assert (change_base(state, src='1-2') == (21, 22, 23)).all()
+
+
+def test_update_invalidates_subtree_only(state):
+    for obj in state:
+        absolute(state, obj)
+
+    state = update(state, '1-1', Point(0, 0, 0))
+    dirty = {obj for obj in state if state._dirty[state._index[obj]]}
+    assert dirty == {'1-1', '1-1-1'}
+
+
+def test_change_base_many(state):
+    objects = ['1', '1-1', '2-1', ROOT]
+    expected = [change_base(state, src=obj, dst='1-2') for obj in objects]
+    assert isclose(
+        change_base_many(state, src=objects, dst='1-2'), expected).all()
+
+    points = array([[0, 0, 0], [1, 2, 3], [-1, 0, 1]])
+    expected = [
+        change_base(state, point=point, src='2-1', dst='1-1')
+        for point in points]
+    assert isclose(
+        change_base_many(state, points, src='2-1', dst='1-1'),
+        expected).all()
+
+    # Without points, a single source gives its origin like change_base
+    origin = change_base_many(state, src='2-1', dst='1-1')
+    assert origin.shape == (1, 3)
+    assert isclose(origin[0], change_base(state, src='2-1', dst='1-1')).all()
+    assert isclose(
+        change_base_many(state, (1, 2, 3), src='2-1', dst='1-1')[0],
+        change_base(state, point=(1, 2, 3), src='2-1', dst='1-1')).all()
+
+
+def test_absolute_many(state):
+    assert (absolute_many(state, ['1', '1-1', '2-1']) == [
+        (1, 2, 3), (12, 14, 16), (-12, -14, -16)]).all()
+
+
+def test_max_z_follows_changes(state):
+    assert max_z(state, ROOT) == 26.0
+    assert max_z(state, '2') == -13.0
+
+    state = update(state, '1-2', Point(0, 0, 40))
+    assert max_z(state, '1') == 40.0
+    assert max_z(state, ROOT) == 43.0
+
+    state = add(state, '2-1-1', parent='2-1', point=Point(0, 0, 100))
+    assert max_z(state, '2') == 87.0
+    assert max_z(state, ROOT) == 84.0
+
+    state = remove(state, '2-1')
+    assert max_z(state, '2') == -23.0
+    assert max_z(state, ROOT) == 43.0
+
+    state = add(state, '3', transform=rotate(1.0), point=Point(0, 0, 50))
+    assert isclose(max_z(state, ROOT), 50.0)
@@ -86,7 +86,7 @@ def fixture(config, monkeypatch):
         )
 
 
-def test_update_instrument_config(fixture, monkeypatch):
+def test_update_instrument_config(fixture, monkeypatch, write_immediately):
     from opentrons.trackers.pose_tracker import change_base
     from numpy import array
     import json
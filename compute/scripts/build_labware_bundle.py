@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+"""
+Compiles a labware definition directory into a bundle (see
+opentrons.data_storage.labware_bundle) when building the image.
+
+Importing the opentrons package runs the database migration and creates the
+robot, so labware_bundle is loaded on its own from the installed package
+"""
+import importlib.util
+import os
+import sys
+
+package = importlib.util.find_spec('opentrons')
+module_path = os.path.join(
+    package.submodule_search_locations[0], 'data_storage', 'labware_bundle.py')
+spec = importlib.util.spec_from_file_location('labware_bundle', module_path)
+labware_bundle = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(labware_bundle)
+
+sys.exit(labware_bundle.main(sys.argv[1:]))